@@ -0,0 +1,15 @@
+"""
+Server launcher: python -m app
+
+Only reads the runtime layout here; importing app.main would build a full
+pipeline in this supervisor process (and again in every spawned child).
+Each uvicorn worker imports app.main itself and applies its own thread
+limits and pinning.
+"""
+
+import uvicorn
+
+from app.config import get_runtime_layout
+
+if __name__ == "__main__":
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, workers=get_runtime_layout().workers)
@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+from app.config import get_settings, get_runtime_layout
+
+settings = get_settings()
+
+# Scheduling priority; lower runs first
+INTERACTIVE = 0
+BULK = 1
+
+class AdmissionRejected(Exception):
+    """Request shed before processing; maps to HTTP 429 with Retry-After"""
+    
+    def __init__(self, reason: str, message: str, retry_after: float):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def take(self, cost: float) -> float:
+        """Take `cost` tokens; returns 0 on success or the seconds until they would be available"""
+        self._refill()
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+    
+    def refund(self, cost: float):
+        self.tokens = min(self.capacity, self.tokens + cost)
+
+class _KeyState:
+    def __init__(self, rate: float, burst: float):
+        self.bucket = TokenBucket(rate, burst)
+        self.in_flight = 0
+
+class AdmissionController:
+    """
+    Cost-aware admission for /detect, driven from the event loop
+    
+    Each API key gets a concurrency cap and a token bucket of "cost" (about
+    one unit per second of audio). Admitted requests share a global pool of
+    processing slots; short interactive clips queue ahead of bulk ones and
+    bulk clips can never take the last RESERVED_INTERACTIVE_SLOTS. Requests
+    that cannot be served soon are rejected early with a retry hint.
+    """
+    
+    def __init__(self, max_concurrency: int = None, key_concurrency: int = None,
+                 cost_per_second: float = None, burst: float = None):
+        self.max_concurrency = (max_concurrency or settings.ADMISSION_MAX_CONCURRENCY
+                                or get_runtime_layout().threads_per_worker)
+        self.key_concurrency = key_concurrency or settings.KEY_MAX_CONCURRENCY
+        self.cost_per_second = cost_per_second or settings.KEY_COST_PER_SECOND
+        self.burst = burst or settings.KEY_COST_BURST
+        self.reserved_interactive = min(settings.RESERVED_INTERACTIVE_SLOTS, self.max_concurrency - 1)
+        self.interactive_max_seconds = settings.INTERACTIVE_MAX_SECONDS
+        self.max_queue = settings.ADMISSION_MAX_QUEUE
+        self.queue_timeout = settings.ADMISSION_QUEUE_TIMEOUT
+        
+        self.in_flight = 0
+        self._keys: Dict[str, _KeyState] = {}
+        self._queue = []
+        self._sequence = itertools.count()
+        self.metrics = {
+            'admitted': 0,
+            'queued': 0,
+            'rejected': {'key_concurrency': 0, 'key_rate': 0, 'queue_full': 0, 'queue_timeout': 0},
+        }
+    
+    def estimate_cost(self, size_bytes: int, duration: float, max_duration: float) -> Tuple[float, bool]:
+        """
+        Cost in audio-second units from the upload size and header duration
+        Returns: (cost, is_interactive)
+        """
+        seconds = min(duration, max_duration)
+        cost = settings.ADMISSION_BASE_COST + seconds + settings.ADMISSION_COST_PER_MB * size_bytes / (1024 * 1024)
+        return cost, seconds <= self.interactive_max_seconds
+    
+    def _limit(self, priority: int) -> int:
+        return self.max_concurrency - (self.reserved_interactive if priority == BULK else 0)
+    
+    def _queued(self, priority: int = BULK) -> int:
+        """Waiters at or ahead of the given priority"""
+        return sum(1 for p, _, waiter in self._queue if p <= priority and not waiter.done())
+    
+    def reserve(self, key: str, cost: float) -> float:
+        """
+        Per-key checks that need no decoding: hold one of the key's concurrent
+        requests and take `cost` from its bucket. Returns the cost taken
+        """
+        state = self._keys.setdefault(key, _KeyState(self.cost_per_second, self.burst))
+        if state.in_flight >= self.key_concurrency:
+            raise self._reject('key_concurrency', "Too many concurrent requests for this API key", 1.0)
+        
+        # Oversized requests drain a full bucket rather than being unservable
+        cost = min(cost, self.burst)
+        wait = state.bucket.take(cost)
+        if wait > 0:
+            raise self._reject('key_rate', "Request budget for this API key exhausted", wait)
+        
+        state.in_flight += 1
+        return cost
+    
+    def unreserve(self, key: str):
+        """Drop a reservation whose request never reached acquire()"""
+        self._keys[key].in_flight -= 1
+    
+    async def acquire(self, key: str, cost: float, interactive: bool, prepaid: Optional[float] = None):
+        """
+        Wait for a processing slot or raise AdmissionRejected
+        `prepaid` is what reserve() already took for this request; only the rest of `cost` is charged
+        """
+        if prepaid is None:
+            cost = self.reserve(key, cost)
+            state = self._keys[key]
+        else:
+            state = self._keys[key]
+            extra = max(0.0, min(cost, self.burst) - prepaid)
+            wait = state.bucket.take(extra)
+            if wait > 0:
+                # The prepaid part paid for decoding and is not refunded
+                state.in_flight -= 1
+                raise self._reject('key_rate', "Request budget for this API key exhausted", wait)
+            cost = prepaid + extra
+        
+        priority = INTERACTIVE if interactive else BULK
+        if self.in_flight < self._limit(priority) and not self._queued(priority):
+            self.in_flight += 1
+            self.metrics['admitted'] += 1
+            return
+        
+        if self._queued() >= self.max_queue:
+            state.in_flight -= 1
+            state.bucket.refund(cost)
+            raise self._reject('queue_full', "Server busy", self.queue_timeout)
+        
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+        self.metrics['queued'] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            cancelled = isinstance(e, asyncio.CancelledError)
+            if waiter.done():
+                # The slot was handed over just as the wait ended
+                if cancelled:
+                    self.release(key)
+                    raise
+            else:
+                waiter.cancel()
+                state.in_flight -= 1
+                state.bucket.refund(cost)
+                if cancelled:
+                    raise
+                raise self._reject('queue_timeout', "Server busy", self.queue_timeout)
+        self.metrics['admitted'] += 1
+    
+    def release(self, key: str):
+        self.in_flight -= 1
+        self._keys[key].in_flight -= 1
+        self._dispatch()
+    
+    def _dispatch(self):
+        """Hand free slots to waiters in priority order"""
+        while self._queue:
+            priority, _, waiter = self._queue[0]
+            if waiter.done():
+                heapq.heappop(self._queue)
+                continue
+            if self.in_flight >= self._limit(priority):
+                return
+            heapq.heappop(self._queue)
+            self.in_flight += 1
+            waiter.set_result(None)
+    
+    def _reject(self, reason: str, message: str, retry_after: float) -> AdmissionRejected:
+        self.metrics['rejected'][reason] += 1
+        return AdmissionRejected(reason, message, retry_after)
+    
+    @asynccontextmanager
+    async def admit(self, key: str, cost: float, interactive: bool, prepaid: Optional[float] = None):
+        await self.acquire(key, cost, interactive, prepaid)
+        try:
+            yield
+        finally:
+            self.release(key)
+    
+    def stats(self) -> dict:
+        return {
+            **self.metrics,
+            'in_flight': self.in_flight,
+            'queue_depth': self._queued(),
+            'max_concurrency': self.max_concurrency,
+            'keys': len(self._keys),
+        }
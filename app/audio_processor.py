@@ -3,20 +3,67 @@ import io
 import librosa
 import soundfile as sf
 import numpy as np
-from typing import Tuple
+from typing import Optional, Tuple
 from app.config import get_settings
 
 settings = get_settings()
 
+# Containers we accept; anything else is rejected from the header alone
+SUPPORTED_FORMATS = {"WAV", "WAVEX", "RF64", "FLAC", "OGG", "MP3", "AIFF"}
+
+# Samples per chunk for buffer reductions; small enough to stay in L2 cache
+CHUNK_SIZE = 64 * 1024
+
+# Peak amplitude below which audio is treated as silence
+SILENCE_THRESHOLD = 0.001
+
+# Voice activity detection: 32 ms frames at 16 kHz, speech regions padded by ~160 ms
+VAD_FRAME_LENGTH = 512
+VAD_HANGOVER_FRAMES = 5
+# Per aggressiveness: (dB above the noise floor, dB relative to the loudest frame)
+VAD_LEVELS = {1: (6.0, -45.0), 2: (9.0, -40.0), 3: (12.0, -35.0)}
+# Frames crossing zero more often than this look like noise and need a larger energy margin
+VAD_MAX_ZCR = 0.35
+
 class AudioProcessor:
     def __init__(self):
         self.sample_rate = settings.SAMPLE_RATE
         self.max_length = settings.MAX_AUDIO_LENGTH
         self.max_file_size = settings.MAX_FILE_SIZE
+        self.dtype = np.dtype(settings.AUDIO_DTYPE)
+        self.vad_aggressiveness = settings.VAD_AGGRESSIVENESS
+        self.raw_max_length = settings.MAX_RAW_AUDIO_LENGTH
     
-    def decode_base64_audio(self, base64_string: str) -> Tuple[np.ndarray, int]:
-        """Decode base64 string to audio array"""
+    @property
+    def decode_max_length(self) -> int:
+        """Seconds of raw audio to decode; with VAD on, extra room to find max_length of speech"""
+        if self.vad_aggressiveness:
+            return max(self.raw_max_length, self.max_length)
+        return self.max_length
+    
+    def probe_audio(self, audio_bytes: bytes):
+        """Read format, sample rate, channels and duration from the header without decoding"""
+        try:
+            info = sf.info(io.BytesIO(audio_bytes))
+        except Exception:
+            raise ValueError("Unsupported or corrupt audio container")
+        
+        if info.format not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported audio format: {info.format}")
+        
+        if info.samplerate <= 0 or info.channels <= 0 or info.frames <= 0:
+            raise ValueError("Audio file contains no samples")
+        
+        return info
+    
+    def decode_base64(self, base64_string: str) -> bytes:
+        """Decode a base64 payload to file bytes, enforcing the size limit"""
         try:
+            # Reject oversized payloads before spending time on base64 decoding
+            # Each trailing '=' is padding, not a decoded byte
+            if len(base64_string) * 3 // 4 - base64_string[-2:].count('=') > self.max_file_size:
+                raise ValueError(f"Audio file too large. Max size: {self.max_file_size} bytes")
+            
             # Decode base64
             audio_bytes = base64.b64decode(base64_string)
             
@@ -24,9 +71,43 @@ class AudioProcessor:
             if len(audio_bytes) > self.max_file_size:
                 raise ValueError(f"Audio file too large. Max size: {self.max_file_size} bytes")
             
-            # Load audio from bytes
+            return audio_bytes
+            
+        except Exception as e:
+            raise ValueError(f"Error processing audio: {str(e)}")
+    
+    def decode_base64_audio(self, base64_string: str) -> Tuple[np.ndarray, int]:
+        """Decode base64 string to audio array"""
+        return self.decode_audio_bytes(self.decode_base64(base64_string))
+    
+    def decode_audio_bytes(self, audio_bytes: bytes, metadata: Optional[dict] = None) -> Tuple[np.ndarray, int]:
+        """
+        Decode an audio file's bytes to a mono array at the target sample rate
+        Container details from the header are added to `metadata` when given
+        """
+        try:
+            # Check file size
+            if len(audio_bytes) > self.max_file_size:
+                raise ValueError(f"Audio file too large. Max size: {self.max_file_size} bytes")
+            
+            # Sniff the header so broken or unsupported payloads fail before decoding
+            info = self.probe_audio(audio_bytes)
+            if metadata is not None:
+                metadata.update(
+                    format=info.format,
+                    sample_rate=info.samplerate,
+                    channels=info.channels,
+                    duration=round(info.duration, 3),
+                    size_bytes=len(audio_bytes)
+                )
+            
+            # Decode only the frames that can survive truncation
+            max_frames = int(info.samplerate * self.decode_max_length)
             audio_io = io.BytesIO(audio_bytes)
-            audio, sr = sf.read(audio_io)
+            audio, sr = sf.read(audio_io, frames=min(info.frames, max_frames), dtype=self.dtype.name)
+            
+            if len(audio) == 0:
+                raise ValueError("Audio file contains no samples")
             
             # Convert stereo to mono if needed
             if len(audio.shape) > 1:
@@ -36,8 +117,8 @@ class AudioProcessor:
             if sr != self.sample_rate:
                 audio = librosa.resample(audio, orig_sr=sr, target_sr=self.sample_rate)
             
-            # Trim or pad to max length
-            max_samples = self.sample_rate * self.max_length
+            # Trim to decode limit (resampling may add a sample or two)
+            max_samples = self.sample_rate * self.decode_max_length
             if len(audio) > max_samples:
                 audio = audio[:max_samples]
             
@@ -46,24 +127,102 @@ class AudioProcessor:
         except Exception as e:
             raise ValueError(f"Error processing audio: {str(e)}")
     
-    def validate_audio(self, audio: np.ndarray) -> bool:
-        """Validate audio array"""
+    def _peak_amplitude(self, audio: np.ndarray) -> float:
+        """Max absolute sample in one chunked pass; NaN or Inf if the buffer has any"""
+        scratch = np.empty(min(len(audio), CHUNK_SIZE), dtype=audio.dtype)
+        peak = 0.0
+        for start in range(0, len(audio), CHUNK_SIZE):
+            chunk = audio[start:start + CHUNK_SIZE]
+            out = scratch[:len(chunk)]
+            np.abs(chunk, out=out)
+            chunk_peak = float(out.max())
+            # max() propagates NaN and Inf, so corrupt samples end the scan early
+            if not np.isfinite(chunk_peak):
+                return chunk_peak
+            peak = max(peak, chunk_peak)
+        return peak
+    
+    def validate_and_normalize(self, audio: np.ndarray) -> Tuple[bool, np.ndarray]:
+        """
+        Validate and peak-normalize audio in place
+        Returns: (is_valid, normalized audio)
+        """
         if audio is None or len(audio) == 0:
-            return False
+            return False, audio
         
-        # Check for silence (all zeros or very low amplitude)
-        if np.max(np.abs(audio)) < 0.001:
-            return False
+        if not np.issubdtype(audio.dtype, np.floating):
+            audio = audio.astype(self.dtype)
         
-        # Check for NaN or Inf
-        if np.any(np.isnan(audio)) or np.any(np.isinf(audio)):
+        # Silence, NaN and Inf checks all come from a single reduction
+        peak = self._peak_amplitude(audio)
+        if not np.isfinite(peak) or peak < SILENCE_THRESHOLD:
+            return False, audio
+        
+        np.multiply(audio, 1.0 / peak, out=audio)
+        return True, audio
+    
+    def validate_audio(self, audio: np.ndarray) -> bool:
+        """Validate audio array"""
+        if audio is None or len(audio) == 0:
             return False
         
-        return True
+        # Check for silence, NaN or Inf
+        audio = np.asarray(audio)
+        # Float buffers are scanned in place; integers are widened so abs() can't overflow
+        if not np.issubdtype(audio.dtype, np.floating):
+            audio = audio.astype(np.float64)
+        peak = self._peak_amplitude(audio)
+        return bool(np.isfinite(peak) and peak >= SILENCE_THRESHOLD)
     
     def normalize_audio(self, audio: np.ndarray) -> np.ndarray:
         """Normalize audio to [-1, 1] range"""
-        max_val = np.max(np.abs(audio))
+        max_val = self._peak_amplitude(audio)
         if max_val > 0:
             audio = audio / max_val
         return audio
+    
+    def detect_speech(self, audio: np.ndarray) -> np.ndarray:
+        """Per-frame speech mask from frame energy and zero-crossing rate"""
+        n_frames = len(audio) // VAD_FRAME_LENGTH
+        frames = audio[:n_frames * VAD_FRAME_LENGTH].reshape(n_frames, VAD_FRAME_LENGTH)
+        
+        energy_db = 10.0 * np.log10(np.einsum('ij,ij->i', frames, frames) / VAD_FRAME_LENGTH + 1e-10)
+        zcr = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1) / VAD_FRAME_LENGTH
+        
+        floor_margin, peak_offset = VAD_LEVELS[self.vad_aggressiveness]
+        noise_floor = np.percentile(energy_db, 10)
+        peak = energy_db.max()
+        # Above the noise floor and not far below the peak; the cap keeps stationary clips whole
+        threshold = min(max(noise_floor + floor_margin, peak + peak_offset), peak - floor_margin)
+        
+        speech = (energy_db > threshold) & ((zcr < VAD_MAX_ZCR) | (energy_db > threshold + floor_margin))
+        
+        # Hangover keeps onsets, offsets and short pauses around detected speech
+        kernel = np.ones(2 * VAD_HANGOVER_FRAMES + 1)
+        # Full convolution sliced back to n_frames; mode='same' pads short inputs to the kernel length
+        dilated = np.convolve(speech, kernel)[VAD_HANGOVER_FRAMES:VAD_HANGOVER_FRAMES + n_frames]
+        return dilated > 0
+    
+    def trim_to_speech(self, audio: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        Concatenate speech regions and cap them at max_length seconds
+        Returns: (speech audio, fraction of input frames that were speech)
+        """
+        max_samples = self.sample_rate * self.max_length
+        if not self.vad_aggressiveness or len(audio) < VAD_FRAME_LENGTH:
+            return audio[:max_samples], 1.0
+        
+        speech = self.detect_speech(audio)
+        speech_ratio = float(np.mean(speech))
+        
+        # Nothing speech-like (e.g. broadband noise): score the clip as it is
+        if speech_ratio == 0.0:
+            return audio[:max_samples], speech_ratio
+        
+        # The partial frame at the end follows the last full frame
+        sample_mask = np.repeat(speech, VAD_FRAME_LENGTH)
+        sample_mask = np.concatenate([sample_mask, np.full(len(audio) - len(sample_mask), speech[-1])])
+        
+        if speech_ratio < 1.0:
+            audio = audio[sample_mask]
+        return audio[:max_samples], speech_ratio
@@ -1,29 +1,84 @@
 from pydantic_settings import BaseSettings
+from dataclasses import dataclass
 from functools import lru_cache
+from typing import Dict, List, Literal, Optional
+import os
+import sys
+import tempfile
 
 class Settings(BaseSettings):
     # API Settings
     API_TITLE: str = "AI Voice Detection API"
     API_VERSION: str = "1.0.0"
     API_KEY: str = "your-secure-api-key-here"
+    API_KEYS: List[str] = []  # additional client keys, each with its own admission quota
+    ADMIN_API_KEY: str = ""  # enables /admin endpoints and X-Profile when set
     
     # Model Settings
     MODEL_PATH: str = "models/classifier.pkl"
     SCALER_PATH: str = "models/scaler.pkl"
+    # Language -> directory holding classifier.pkl (and optionally scaler.pkl)
+    LANGUAGE_MODELS: Dict[str, str] = {}
+    MAX_RESIDENT_MODELS: int = 2
+    MODEL_MEMORY_BUDGET_MB: int = 512
     
     # Audio Settings
     SAMPLE_RATE: int = 16000
     MAX_AUDIO_LENGTH: int = 30  # seconds
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    AUDIO_DTYPE: Literal["float32", "float64"] = "float32"  # decode through features
+    VAD_AGGRESSIVENESS: Literal[0, 1, 2, 3] = 1  # 0 disables silence trimming
+    MAX_RAW_AUDIO_LENGTH: int = 60  # seconds decoded so VAD can find MAX_AUDIO_LENGTH of speech
     
     # Feature Extraction
     N_MFCC: int = 40
     N_MELS: int = 128
     HOP_LENGTH: int = 512
+    N_FFT: int = 2048
+    FFT_BACKEND: Literal["numpy", "scipy", "pyfftw"] = "scipy"
+    FFT_WORKERS: int = 1  # threads per FFT call (scipy/pyfftw)
     
     # Performance
     CACHE_TTL: int = 3600
-    MAX_WORKERS: int = 4
+    MAX_WORKERS: int = 4  # cap on derived server workers
+    WORKERS: int = 0  # server worker processes; 0 derives min(MAX_WORKERS, cores)
+    THREADS_PER_WORKER: int = 0  # BLAS/OpenMP/numba/sklearn threads per process; 0 splits cores evenly
+    PIN_WORKERS: bool = False  # bind each worker to its own cores (Linux)
+    
+    # Admission control (/detect); cost is ~1 unit per second of audio
+    ADMISSION_MAX_CONCURRENCY: int = 0  # requests processed at once per worker; 0 uses THREADS_PER_WORKER
+    RESERVED_INTERACTIVE_SLOTS: int = 1  # slots bulk clips may not occupy
+    INTERACTIVE_MAX_SECONDS: float = 10.0  # clips up to this long are prioritized
+    ADMISSION_MAX_QUEUE: int = 32  # waiting requests before new ones are shed
+    ADMISSION_QUEUE_TIMEOUT: float = 5.0  # seconds a request may wait for a slot
+    ADMISSION_BASE_COST: float = 0.5  # fixed cost per request
+    ADMISSION_COST_PER_MB: float = 0.5  # cost per MB of upload
+    KEY_MAX_CONCURRENCY: int = 4  # in-flight requests per API key
+    KEY_COST_PER_SECOND: float = 30.0  # sustained cost per API key
+    KEY_COST_BURST: float = 120.0  # cost an idle API key may spend at once
+    
+    # Near-duplicate detection
+    FINGERPRINT_ENABLED: bool = True
+    FINGERPRINT_THRESHOLD: float = 0.95  # fraction of the 256 fingerprint bits that must agree
+    FINGERPRINT_INDEX_SIZE: int = 10000  # fingerprints kept per process (LRU)
+    
+    # Profiling
+    PROFILE_SAMPLE_RATE: float = 0.0  # fraction of /detect requests run under cProfile
+    PROFILE_TOP_N: int = 25  # functions kept per captured profile
+    SLOW_REQUEST_MS: float = 2000.0  # requests slower than this are captured
+    SLOW_REQUEST_BUFFER: int = 100  # captures kept in memory
+    
+    # Background Jobs
+    JOB_DB_PATH: str = "jobs.db"
+    JOB_WORKERS: int = 1  # worker processes per API process; 0 disables them
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_LEASE_SECONDS: int = 300  # a running job is retried if its worker is silent this long
+    JOB_MAX_QUEUED: int = 1000
+    JOB_POLL_INTERVAL: float = 0.5
+    JOB_CALLBACK_TIMEOUT: float = 10.0
+    JOB_RETENTION_SECONDS: int = 7 * 24 * 3600  # finished jobs are deleted after this long
+    # Webhook hosts allowed for callback_url; empty allows any host that resolves to public addresses only
+    CALLBACK_ALLOWED_HOSTS: List[str] = []
     
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -34,3 +89,115 @@ class Settings(BaseSettings):
 @lru_cache()
 def get_settings():
     return Settings()
+
+# Native thread pools read these when they start
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "NUMBA_NUM_THREADS",
+)
+
+@dataclass
+class RuntimeLayout:
+    workers: int
+    threads_per_worker: int
+    cores: List[int]
+    job_workers: int = 0  # job processes spawned by each server worker
+    worker_index: Optional[int] = None
+    
+    def worker_cores(self, index: int) -> List[int]:
+        """
+        Cores reserved for worker `index` and its job processes
+        Layouts larger than the machine wrap around
+        """
+        block = self.threads_per_worker * (1 + self.job_workers)
+        start = (index * block) % len(self.cores)
+        return [self.cores[(start + i) % len(self.cores)] for i in range(block)]
+
+def available_cores() -> List[int]:
+    """CPUs this process may run on (respects cgroup/taskset affinity)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+@lru_cache()
+def get_runtime_layout() -> RuntimeLayout:
+    """
+    Derive worker count and per-process threads from settings and available cores
+    Every server worker also spawns JOB_WORKERS job processes, which share the cores
+    """
+    settings = get_settings()
+    cores = available_cores()
+    workers = settings.WORKERS or max(1, min(settings.MAX_WORKERS, len(cores)))
+    processes = workers * (1 + settings.JOB_WORKERS)
+    threads = settings.THREADS_PER_WORKER or max(1, len(cores) // processes)
+    return RuntimeLayout(workers=workers, threads_per_worker=threads, cores=cores, job_workers=settings.JOB_WORKERS)
+
+_worker_slot_fd = None
+
+def _claim_worker_slot(workers: int) -> Optional[int]:
+    """Take the first free worker slot via an exclusive lock held for the process lifetime"""
+    global _worker_slot_fd
+    import fcntl
+    
+    for index in range(workers):
+        path = os.path.join(tempfile.gettempdir(), f"voice-detection-worker-{index}.lock")
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            continue
+        _worker_slot_fd = fd
+        return index
+    return None
+
+def configure_runtime(threads: Optional[int] = None) -> RuntimeLayout:
+    """
+    Cap every native thread pool in this process to THREADS_PER_WORKER
+    Call before numpy/librosa are imported so pools start at the right size;
+    threadpoolctl and numba also adjust pools that are already running.
+    Child processes pass the parent's `threads`: their inherited CPU mask and
+    environment describe the parent, not a fresh layout
+    """
+    layout = get_runtime_layout()
+    explicit = threads is not None
+    if explicit:
+        layout.threads_per_worker = threads
+    threads = layout.threads_per_worker
+    
+    for var in THREAD_ENV_VARS:
+        if explicit:
+            os.environ[var] = str(threads)
+        else:
+            os.environ.setdefault(var, str(threads))
+    
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads)
+    except ImportError:
+        pass
+    
+    if "numba" in sys.modules:
+        import numba
+        numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+    
+    return layout
+
+def pin_worker() -> RuntimeLayout:
+    """
+    With PIN_WORKERS, claim a worker slot and bind this process to its cores
+    Only call from processes that serve requests (e.g. an app startup hook),
+    never from a supervisor that spawns them: children inherit its CPU mask.
+    Job workers started afterwards share the pinned cores
+    """
+    settings = get_settings()
+    layout = get_runtime_layout()
+    if settings.PIN_WORKERS and hasattr(os, "sched_setaffinity") and layout.worker_index is None:
+        layout.worker_index = _claim_worker_slot(layout.workers)
+        if layout.worker_index is not None:
+            os.sched_setaffinity(0, layout.worker_cores(layout.worker_index))
+    return layout
@@ -1,28 +1,89 @@
+import logging
 import librosa
 import numpy as np
-from typing import Dict
+import scipy.fft
+import scipy.fftpack
+from functools import lru_cache, partial
+from typing import Callable, Dict, Tuple
 from app.config import get_settings
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
+@lru_cache()
+def _filterbanks(sample_rate: int, n_fft: int, n_mels: int, n_mfcc: int, dtype: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Build the STFT window, mel filterbank and MFCC DCT matrix once per configuration"""
+    window = librosa.filters.get_window('hann', n_fft, fftbins=True).astype(dtype)
+    mel_basis = librosa.filters.mel(sr=sample_rate, n_fft=n_fft, n_mels=n_mels, dtype=dtype)
+    # Orthonormal DCT-II as a matrix, so MFCCs are one matmul over the log-mel spectrogram
+    dct_basis = scipy.fftpack.dct(np.eye(n_mels), type=2, norm='ortho', axis=0)[:n_mfcc].astype(dtype)
+    return window, mel_basis, dct_basis
+
+@lru_cache(maxsize=128)
+def _chroma_basis(sample_rate: int, n_fft: int, tuning: float, dtype: str) -> np.ndarray:
+    """Chroma filterbank; tuning is estimated on a 0.01 grid so few variants exist"""
+    return librosa.filters.chroma(sr=sample_rate, n_fft=n_fft, tuning=tuning, dtype=dtype)
+
+def get_rfft(backend: str, workers: int = 1) -> Callable:
+    """Return an rfft(x, axis=...) callable for the requested FFT backend"""
+    if backend == "scipy":
+        return partial(scipy.fft.rfft, workers=workers)
+    
+    if backend == "pyfftw":
+        try:
+            import pyfftw
+            import pyfftw.interfaces.numpy_fft
+        except ImportError:
+            logger.warning("pyfftw is not installed, falling back to numpy FFT")
+            return np.fft.rfft
+        pyfftw.interfaces.cache.enable()
+        return partial(pyfftw.interfaces.numpy_fft.rfft, threads=workers)
+    
+    return np.fft.rfft
+
 class FeatureExtractor:
     def __init__(self):
         self.sample_rate = settings.SAMPLE_RATE
         self.n_mfcc = settings.N_MFCC
         self.n_mels = settings.N_MELS
         self.hop_length = settings.HOP_LENGTH
+        self.n_fft = settings.N_FFT
+        self.dtype = np.dtype(settings.AUDIO_DTYPE)
+        self.set_fft_backend(settings.FFT_BACKEND, settings.FFT_WORKERS)
+        # Build the filterbanks at startup instead of on the first request
+        _filterbanks(self.sample_rate, self.n_fft, self.n_mels, self.n_mfcc, self.dtype.name)
+    
+    def set_fft_backend(self, backend: str, workers: int = 1):
+        """Select the FFT implementation used for the shared STFT"""
+        self.fft_backend = backend
+        self._rfft = get_rfft(backend, workers)
+    
+    def _stft_magnitude(self, audio: np.ndarray) -> np.ndarray:
+        """Centered, zero-padded Hann STFT magnitude, shape (1 + n_fft // 2, n_frames)"""
+        window, _, _ = _filterbanks(self.sample_rate, self.n_fft, self.n_mels, self.n_mfcc, self.dtype.name)
+        padded = np.pad(audio, self.n_fft // 2, mode='constant')
+        # Frames along the last axis keep each FFT input contiguous
+        frames = np.lib.stride_tricks.sliding_window_view(padded, self.n_fft)[::self.hop_length]
+        spectrum = self._rfft(frames * window, axis=-1)
+        return np.abs(spectrum).astype(self.dtype, copy=False).T
     
     def extract_features(self, audio: np.ndarray) -> np.ndarray:
         """Extract comprehensive audio features"""
         features = {}
         
+        # Keep STFT and statistics in the configured precision (complex64 for float32)
+        audio = np.asarray(audio, dtype=self.dtype)
+        
+        # One STFT shared by every spectral feature; bases come from the cache
+        _, mel_basis, dct_basis = _filterbanks(self.sample_rate, self.n_fft, self.n_mels, self.n_mfcc, self.dtype.name)
+        magnitude = self._stft_magnitude(audio)
+        power = magnitude ** 2
+        mel_spec = mel_basis @ power
+        log_mel = librosa.power_to_db(mel_spec)
+        
         # 1. MFCC Features (Mel-frequency cepstral coefficients)
-        mfcc = librosa.feature.mfcc(
-            y=audio, 
-            sr=self.sample_rate, 
-            n_mfcc=self.n_mfcc,
-            hop_length=self.hop_length
-        )
+        mfcc = dct_basis @ log_mel
         features['mfcc_mean'] = np.mean(mfcc, axis=1)
         features['mfcc_std'] = np.std(mfcc, axis=1)
         features['mfcc_max'] = np.max(mfcc, axis=1)
@@ -30,57 +91,50 @@ class FeatureExtractor:
         
         # 2. Spectral Features
         spectral_centroid = librosa.feature.spectral_centroid(
-            y=audio, 
+            S=magnitude, 
             sr=self.sample_rate,
-            hop_length=self.hop_length
+            n_fft=self.n_fft
         )
         features['spectral_centroid_mean'] = np.mean(spectral_centroid)
         features['spectral_centroid_std'] = np.std(spectral_centroid)
         
         spectral_rolloff = librosa.feature.spectral_rolloff(
-            y=audio, 
+            S=magnitude, 
             sr=self.sample_rate,
-            hop_length=self.hop_length
+            n_fft=self.n_fft
         )
         features['spectral_rolloff_mean'] = np.mean(spectral_rolloff)
         features['spectral_rolloff_std'] = np.std(spectral_rolloff)
         
         spectral_bandwidth = librosa.feature.spectral_bandwidth(
-            y=audio, 
+            S=magnitude, 
             sr=self.sample_rate,
-            hop_length=self.hop_length
+            n_fft=self.n_fft
         )
         features['spectral_bandwidth_mean'] = np.mean(spectral_bandwidth)
         features['spectral_bandwidth_std'] = np.std(spectral_bandwidth)
         
         # 3. Zero Crossing Rate
-        zcr = librosa.feature.zero_crossing_rate(audio, hop_length=self.hop_length)
+        zcr = librosa.feature.zero_crossing_rate(audio, frame_length=self.n_fft, hop_length=self.hop_length)
         features['zcr_mean'] = np.mean(zcr)
         features['zcr_std'] = np.std(zcr)
         
         # 4. Chroma Features
-        chroma = librosa.feature.chroma_stft(
-            y=audio, 
-            sr=self.sample_rate,
-            hop_length=self.hop_length
-        )
+        tuning = librosa.estimate_tuning(S=power, sr=self.sample_rate, n_fft=self.n_fft, bins_per_octave=12)
+        chroma_basis = _chroma_basis(self.sample_rate, self.n_fft, round(float(tuning), 2), self.dtype.name)
+        chroma = librosa.util.normalize(chroma_basis @ power, norm=np.inf, axis=0)
         features['chroma_mean'] = np.mean(chroma, axis=1)
         features['chroma_std'] = np.std(chroma, axis=1)
         
         # 5. Mel Spectrogram
-        mel_spec = librosa.feature.melspectrogram(
-            y=audio, 
-            sr=self.sample_rate,
-            n_mels=self.n_mels,
-            hop_length=self.hop_length
-        )
-        mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
+        # power_to_db(S, ref=np.max) is the ref=1.0 result shifted by the peak in dB
+        mel_spec_db = log_mel - 10.0 * np.log10(max(1e-10, float(mel_spec.max())))
         features['mel_mean'] = np.mean(mel_spec_db)
         features['mel_std'] = np.std(mel_spec_db)
         
         # 6. Temporal Features
         features['duration'] = len(audio) / self.sample_rate
-        features['rms_mean'] = np.mean(librosa.feature.rms(y=audio, hop_length=self.hop_length))
+        features['rms_mean'] = np.mean(librosa.feature.rms(y=audio, frame_length=self.n_fft, hop_length=self.hop_length))
         
         # Flatten all features into a single vector
         feature_vector = []
@@ -93,7 +147,8 @@ class FeatureExtractor:
         
         #return np.array(feature_vector)[:100]
         # Feature vector ko exactly 100 dimensions ka banayein
-        final_vector = np.array(feature_vector)
+        # The scaler and classifier were fit on float64 features
+        final_vector = np.array(feature_vector, dtype=np.float64)
         if len(final_vector) > 100:
             final_vector = final_vector[:100]
         elif len(final_vector) < 100:
@@ -0,0 +1,170 @@
+import threading
+import numpy as np
+import librosa
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+from app.config import get_settings
+
+settings = get_settings()
+
+# 32 ms frames every 8 ms, 16 mel bands up to telephone bandwidth so
+# resampled or low-bitrate copies of a clip keep the same spectrum
+FRAME_LENGTH = 512
+HOP_LENGTH = 128
+N_BANDS = 16
+F_MIN = 80.0
+F_MAX = 4000.0
+N_BITS = 256
+BAND_BITS = 16
+# Bits from long-term band statistics (mostly the voice); the rest come from
+# lagged cross-band covariance (the order of spectral events, i.e. the content)
+STATIC_BITS = 128
+# Lags in frames: 128, 256 and 512 ms, syllable to word scale
+LAGS = (16, 32, 64)
+# Spectral floor relative to the loudest band (-30 dB), so codec noise in valleys is ignored
+FLOOR_RATIO = 1e-3
+# Frames more than 30 dB below the loudest frame are treated as silence
+ACTIVE_RANGE = 3.0
+# Clips whose active durations differ more than this are never duplicates
+MIN_DURATION_RATIO = 0.5
+
+@dataclass(frozen=True)
+class Fingerprint:
+    bits: int
+    active_seconds: float
+
+@lru_cache()
+def _fingerprint_basis(sample_rate: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Window, mel filterbank and the fixed index pairs compared for the static and lagged bits"""
+    window = np.hanning(FRAME_LENGTH).astype(np.float32)
+    # Adjacent pairs of 32 mel filters summed into 16 wide bands, which average out codec noise
+    mel_basis = librosa.filters.mel(sr=sample_rate, n_fft=FRAME_LENGTH, n_mels=2 * N_BANDS, fmin=F_MIN, fmax=F_MAX)
+    mel_basis = mel_basis.reshape(N_BANDS, 2, -1).sum(axis=1)
+    rng = np.random.default_rng(0)
+    # Each static bit compares two bands within the same statistic (mean, spread or change)
+    static_pairs = []
+    for i in range(STATIC_BITS):
+        offset = (i % 3) * N_BANDS
+        a, b = rng.choice(N_BANDS, size=2, replace=False)
+        static_pairs.append((offset + a, offset + b))
+    # Each lagged bit compares two band-pair covariances at the same lag
+    lag_pairs = []
+    for i in range(N_BITS - STATIC_BITS):
+        offset = (i % len(LAGS)) * N_BANDS * N_BANDS
+        a, b = rng.choice(N_BANDS * N_BANDS, size=2, replace=False)
+        lag_pairs.append((offset + a, offset + b))
+    return window, mel_basis.T.astype(np.float32), np.array(static_pairs), np.array(lag_pairs)
+
+def compute_fingerprint(audio: np.ndarray, sample_rate: int) -> Optional[Fingerprint]:
+    """
+    Ordinal hash of a clip's log-mel statistics and their temporal structure over active frames
+    Invariant to gain, leading/trailing silence and resampling; None if too short
+    """
+    if len(audio) < FRAME_LENGTH + HOP_LENGTH:
+        return None
+    
+    window, mel_basis, static_pairs, lag_pairs = _fingerprint_basis(sample_rate)
+    frames = np.lib.stride_tricks.sliding_window_view(audio, FRAME_LENGTH)[::HOP_LENGTH] * window
+    mel = np.abs(np.fft.rfft(frames, axis=1)) ** 2 @ mel_basis
+    log_mel = np.log10(mel + mel.max() * FLOOR_RATIO + 1e-12)
+    
+    loudness = log_mel.max(axis=1)
+    active = log_mel[loudness > loudness.max() - ACTIVE_RANGE]
+    change = np.abs(np.diff(active, axis=0)).mean(axis=0) if len(active) > 1 else np.zeros(N_BANDS)
+    descriptor = np.concatenate([active.mean(axis=0), active.std(axis=0), change])
+    
+    # Band i now vs band j `lag` frames later: shift invariant, but depends on what follows what
+    centered = active - active.mean(axis=0)
+    covariance = np.stack([
+        centered[:-lag].T @ centered[lag:] / (len(centered) - lag) if len(centered) > lag
+        else np.zeros((N_BANDS, N_BANDS))
+        for lag in LAGS
+    ]).ravel()
+    
+    bits = np.concatenate([
+        descriptor[static_pairs[:, 0]] > descriptor[static_pairs[:, 1]],
+        covariance[lag_pairs[:, 0]] > covariance[lag_pairs[:, 1]],
+    ])
+    value = int.from_bytes(np.packbits(bits).tobytes(), 'big')
+    return Fingerprint(bits=value, active_seconds=len(active) * HOP_LENGTH / sample_rate)
+
+class FingerprintIndex:
+    """
+    Bounded LRU of fingerprints -> prior verdicts, searched by banded LSH
+    A candidate sharing any 16-bit band is confirmed by Hamming similarity
+    """
+    
+    def __init__(self, max_entries: int = None, threshold: float = None):
+        self.max_entries = settings.FINGERPRINT_INDEX_SIZE if max_entries is None else max_entries
+        self.threshold = settings.FINGERPRINT_THRESHOLD if threshold is None else threshold
+        self._entries = OrderedDict()
+        self._bands = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.metrics = {
+            'lookups': 0,
+            'hits': 0,
+            'inserts': 0,
+            'evictions': 0,
+        }
+    
+    @staticmethod
+    def _band_keys(language: str, bits: int):
+        mask = (1 << BAND_BITS) - 1
+        for band in range(N_BITS // BAND_BITS):
+            yield (language, band, (bits >> (band * BAND_BITS)) & mask)
+    
+    def lookup(self, fingerprint: Fingerprint, language: str) -> Optional[dict]:
+        """Return the verdict of the most similar indexed clip above the threshold"""
+        with self._lock:
+            self.metrics['lookups'] += 1
+            candidates = set()
+            for key in self._band_keys(language, fingerprint.bits):
+                candidates.update(self._bands.get(key, ()))
+            
+            best_id, best_similarity = None, self.threshold
+            for entry_id in candidates:
+                other, verdict = self._entries[entry_id]
+                durations = sorted((other.active_seconds, fingerprint.active_seconds))
+                if durations[0] < durations[1] * MIN_DURATION_RATIO:
+                    continue
+                similarity = 1.0 - bin(other.bits ^ fingerprint.bits).count('1') / N_BITS
+                if similarity >= best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            
+            if best_id is None:
+                return None
+            self._entries.move_to_end(best_id)
+            self.metrics['hits'] += 1
+            return {**self._entries[best_id][1], 'similarity': best_similarity}
+    
+    def add(self, fingerprint: Fingerprint, language: str, verdict: dict):
+        """Index a clip's verdict, evicting the least recently matched entries"""
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (fingerprint, {**verdict, 'language': language})
+            for key in self._band_keys(language, fingerprint.bits):
+                self._bands.setdefault(key, set()).add(entry_id)
+            self.metrics['inserts'] += 1
+            
+            while len(self._entries) > self.max_entries:
+                old_id, (old, old_verdict) = self._entries.popitem(last=False)
+                for key in self._band_keys(old_verdict['language'], old.bits):
+                    bucket = self._bands[key]
+                    bucket.discard(old_id)
+                    if not bucket:
+                        del self._bands[key]
+                self.metrics['evictions'] += 1
+    
+    def stats(self) -> dict:
+        lookups = self.metrics['lookups']
+        return {
+            **self.metrics,
+            'hit_rate': self.metrics['hits'] / lookups if lookups else 0.0,
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'threshold': self.threshold,
+        }
@@ -0,0 +1,351 @@
+import ipaddress
+import json
+import logging
+import multiprocessing
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from typing import List, Optional
+
+from app.config import get_settings, configure_runtime, get_runtime_layout
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Job lifecycle
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Seconds between checks for worker processes that have exited
+SUPERVISE_INTERVAL = 5.0
+# Seconds between retention sweeps in each worker
+PURGE_INTERVAL = 3600.0
+
+class QueueFullError(Exception):
+    """Raised when the job queue already holds JOB_MAX_QUEUED pending jobs"""
+
+class JobStore:
+    """Durable job queue in a local SQLite database, safe to share between processes"""
+    
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.JOB_DB_PATH
+        self.max_attempts = settings.JOB_MAX_ATTEMPTS
+        self.lease_seconds = settings.JOB_LEASE_SECONDS
+        self.max_queued = settings.JOB_MAX_QUEUED
+        self.retention_seconds = settings.JOB_RETENTION_SECONDS
+        self._init_db()
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    audio_data TEXT,
+                    callback_url TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    lease_expires REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        finally:
+            conn.close()
+    
+    def submit(self, audio_data: str, language: str, callback_url: Optional[str] = None) -> str:
+        """Enqueue a job and return its id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+            if pending >= self.max_queued:
+                conn.execute("ROLLBACK")
+                raise QueueFullError(f"Job queue is full ({pending} pending jobs)")
+            conn.execute(
+                "INSERT INTO jobs (id, status, language, audio_data, callback_url, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, language, audio_data, callback_url, now, now)
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return job_id
+    
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return job status and result (without the audio payload), or None"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT id AS job_id, status, language, attempts, result, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+    
+    def claim(self) -> Optional[dict]:
+        """
+        Lease the oldest runnable job to the calling worker
+        Jobs whose lease expired (worker died) are picked up again; one that has
+        no attempts left is failed and returned with status FAILED if it still
+        owes its webhook a notification
+        """
+        conn = self._connect()
+        try:
+            while True:
+                now = time.time()
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT id, language, audio_data, callback_url, attempts FROM jobs "
+                    "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                
+                if row["attempts"] >= self.max_attempts:
+                    self._finish(conn, row["id"], FAILED, error="Job exceeded maximum attempts")
+                    conn.execute("COMMIT")
+                    if row["callback_url"]:
+                        return {**dict(row), "status": FAILED}
+                    continue
+                
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_expires = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (RUNNING, now + self.lease_seconds, now, row["id"])
+                )
+                conn.execute("COMMIT")
+                job = dict(row)
+                job["attempts"] += 1
+                job["status"] = RUNNING
+                return job
+        finally:
+            conn.close()
+    
+    def _finish(self, conn: sqlite3.Connection, job_id: str, status: str, result: dict = None, error: str = None):
+        # The audio payload is no longer needed once a job is terminal
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, audio_data = NULL, "
+            "lease_expires = NULL, updated_at = ? WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+        )
+    
+    def complete(self, job_id: str, result: dict):
+        conn = self._connect()
+        try:
+            self._finish(conn, job_id, DONE, result=result)
+        finally:
+            conn.close()
+    
+    def fail(self, job_id: str, error: str, retry: bool = True):
+        """Record a failure; the job is requeued while attempts remain"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if retry and row is not None and row["attempts"] < self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, lease_expires = NULL, updated_at = ? WHERE id = ?",
+                    (QUEUED, error, time.time(), job_id)
+                )
+            else:
+                self._finish(conn, job_id, FAILED, error=error)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+    
+    def purge(self) -> int:
+        """Delete finished jobs older than the retention period; returns how many"""
+        cutoff = time.time() - self.retention_seconds
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (DONE, FAILED, cutoff)
+            )
+        finally:
+            conn.close()
+        return cursor.rowcount
+    
+    def stats(self) -> dict:
+        """Job counts by status"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+def check_callback_url(url: str):
+    """
+    Raise ValueError unless url is an http(s) webhook on a public address
+    Loopback, private, link-local and reserved targets would let API clients reach
+    internal services; with CALLBACK_ALLOWED_HOSTS set only those hosts are accepted
+    """
+    parsed = urllib.parse.urlsplit(url)
+    host = parsed.hostname
+    if parsed.scheme not in ("http", "https") or not host:
+        raise ValueError("Callback URL must be an http(s) URL")
+    
+    if settings.CALLBACK_ALLOWED_HOSTS:
+        if host.lower() not in {allowed.lower() for allowed in settings.CALLBACK_ALLOWED_HOSTS}:
+            raise ValueError(f"Callback host {host} is not allowed")
+        return
+    
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parsed.port or 80, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError):
+        raise ValueError(f"Callback host {host} does not resolve")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"Callback host {host} resolves to a non-public address")
+
+class _CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Apply the callback URL check to redirect targets as well"""
+    
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_callback_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+_callback_opener = urllib.request.build_opener(_CheckedRedirectHandler)
+
+def send_callback(url: str, payload: dict):
+    """POST the finished job to its webhook; delivery is best-effort"""
+    try:
+        # Re-checked at send time: DNS may have changed since submission
+        check_callback_url(url)
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with _callback_opener.open(request, timeout=settings.JOB_CALLBACK_TIMEOUT):
+            pass
+    except Exception as e:
+        logger.warning(f"Webhook delivery to {url} failed: {e}")
+
+def process_next(store: JobStore, pipeline) -> bool:
+    """Run one queued job through the pipeline; returns False if the queue was empty"""
+    job = store.claim()
+    if job is None:
+        return False
+    
+    if job["status"] == FAILED:
+        # Its last lease expired (the worker died); only the webhook is left to send
+        send_callback(job["callback_url"], store.get(job["id"]))
+        return True
+    
+    try:
+        response = pipeline.run(job["audio_data"], job["language"])
+    except ValueError as e:
+        # Bad audio will not get better on retry
+        store.fail(job["id"], str(e), retry=False)
+    except Exception as e:
+        logger.error(f"Job {job['id']} attempt {job['attempts']} failed: {e}")
+        store.fail(job["id"], f"Internal error: {e}")
+    else:
+        store.complete(job["id"], response.model_dump(mode="json"))
+    
+    if job["callback_url"]:
+        final = store.get(job["id"])
+        if final["status"] in (DONE, FAILED):
+            send_callback(job["callback_url"], final)
+    return True
+
+def run_worker(db_path: str, threads: Optional[int] = None):
+    """Worker process entry point: drain the queue until terminated"""
+    configure_runtime(threads)
+    from app.pipeline import DetectionPipeline
+    
+    store = JobStore(db_path)
+    pipeline = DetectionPipeline()
+    logger.info(f"Job worker started (db={db_path})")
+    last_purge = 0.0
+    while True:
+        if time.monotonic() - last_purge >= PURGE_INTERVAL:
+            purged = store.purge()
+            if purged:
+                logger.info(f"Deleted {purged} finished jobs past retention")
+            last_purge = time.monotonic()
+        if not process_next(store, pipeline):
+            time.sleep(settings.JOB_POLL_INTERVAL)
+
+class JobWorkerPool:
+    """
+    Fixed number of worker processes; the pool size is the job concurrency limit
+    A supervisor thread replaces workers that exit unexpectedly
+    """
+    
+    def __init__(self, db_path: str = None, workers: int = None):
+        self.db_path = db_path or settings.JOB_DB_PATH
+        self.workers = settings.JOB_WORKERS if workers is None else workers
+        self.processes: List[multiprocessing.Process] = []
+        self.restarts = 0
+        self._ctx = multiprocessing.get_context("spawn")
+        self._stopping = threading.Event()
+        self._supervisor: Optional[threading.Thread] = None
+    
+    def _spawn(self, i: int) -> multiprocessing.Process:
+        # The child inherits a pinned CPU mask, so it gets this process's thread count rather than deriving one
+        threads = get_runtime_layout().threads_per_worker
+        process = self._ctx.Process(target=run_worker, args=(self.db_path, threads), name=f"job-worker-{i}", daemon=True)
+        process.start()
+        return process
+    
+    def start(self):
+        self._stopping.clear()
+        self.processes = [self._spawn(i) for i in range(self.workers)]
+        if self.processes:
+            self._supervisor = threading.Thread(target=self._supervise, name="job-supervisor", daemon=True)
+            self._supervisor.start()
+    
+    def _supervise(self):
+        while not self._stopping.wait(SUPERVISE_INTERVAL):
+            for i, process in enumerate(self.processes):
+                if not process.is_alive() and not self._stopping.is_set():
+                    logger.warning(f"Job worker {process.name} exited with code {process.exitcode}; restarting")
+                    self.processes[i] = self._spawn(i)
+                    self.restarts += 1
+    
+    def stop(self):
+        self._stopping.set()
+        if self._supervisor is not None:
+            self._supervisor.join()
+            self._supervisor = None
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(timeout=5)
+        self.processes = []
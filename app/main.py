@@ -1,15 +1,22 @@
 from fastapi import FastAPI, HTTPException, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-import time
+from starlette.concurrency import run_in_threadpool
 import logging
+import math
+import time
 from typing import Optional
 
-from app.models import AudioRequest, AudioResponse, HealthResponse, ClassificationLabel
-from app.audio_processor import AudioProcessor
-from app.feature_extractor import FeatureExtractor
-from app.predictor import VoicePredictor
-from app.config import get_settings
+from app.config import get_settings, configure_runtime, pin_worker
+
+# Thread limits must be in place before numpy/librosa start their pools
+runtime_layout = configure_runtime()
+
+from app.models import AudioRequest, AudioResponse, HealthResponse, JobRequest, JobResponse
+from app.pipeline import DetectionPipeline
+from app.jobs import JobStore, JobWorkerPool, QueueFullError, check_callback_url
+from app.profiling import RequestProfiler
+from app.admission import AdmissionController, AdmissionRejected
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -35,9 +42,26 @@ app.add_middleware(
 )
 
 # Initialize components
-audio_processor = AudioProcessor()
-feature_extractor = FeatureExtractor()
-predictor = VoicePredictor()
+pipeline = DetectionPipeline()
+predictor = pipeline.predictor
+job_store = JobStore()
+profiler = RequestProfiler()
+admission = AdmissionController()
+job_workers = JobWorkerPool()
+
+@app.on_event("startup")
+async def pin_server_worker():
+    """Bind this serving process to its cores; job workers spawned next inherit them"""
+    pin_worker()
+
+@app.on_event("startup")
+async def start_job_workers():
+    """Start background workers that drain the job queue"""
+    job_workers.start()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    job_workers.stop()
 
 # Authentication
 async def verify_api_key(authorization: Optional[str] = Header(None)):
@@ -48,11 +72,24 @@ async def verify_api_key(authorization: Optional[str] = Header(None)):
     # Support both "Bearer TOKEN" and plain "TOKEN" formats
     token = authorization.replace("Bearer ", "").strip()
     
-    if token != settings.API_KEY:
+    if token != settings.API_KEY and token not in settings.API_KEYS:
         raise HTTPException(status_code=403, detail="Invalid API key")
     
     return token
 
+async def verify_admin_key(x_admin_key: Optional[str] = Header(None)):
+    """Verify the admin key; admin endpoints are disabled unless ADMIN_API_KEY is set"""
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    
+    if x_admin_key is None:
+        raise HTTPException(status_code=401, detail="X-Admin-Key header missing")
+    
+    if x_admin_key != settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid admin key")
+    
+    return x_admin_key
+
 @app.get("/", response_model=HealthResponse)
 async def root():
     """Root endpoint - health check"""
@@ -74,7 +111,9 @@ async def health_check():
 @app.post("/detect", response_model=AudioResponse)
 async def detect_voice(
     request: AudioRequest,
-    api_key: str = Depends(verify_api_key)
+    api_key: str = Depends(verify_api_key),
+    x_profile: Optional[str] = Header(None),
+    x_admin_key: Optional[str] = Header(None)
 ):
     """
     Detect if a voice sample is AI-generated or human
@@ -82,47 +121,40 @@ async def detect_voice(
     - **audio_data**: Base64-encoded MP3 audio file
     - **language**: Language of the audio (Tamil, English, Hindi, Malayalam, Telugu)
     """
-    start_time = time.time()
+    # X-Profile is only honoured together with a valid admin key
+    requested = x_profile is not None and bool(settings.ADMIN_API_KEY) and x_admin_key == settings.ADMIN_API_KEY
+    trace = {"language": request.language}
+    start = time.perf_counter()
     
     try:
-        # Step 1: Decode and process audio
-        logger.info(f"Processing audio for language: {request.language}")
-        audio, sr = audio_processor.decode_base64_audio(request.audio_data)
+        # Per-key limits are checked against the upload size before anything is decoded
+        upload_cost, _ = admission.estimate_cost(len(request.audio_data) * 3 // 4 - request.audio_data[-2:].count('='), 0.0, 0.0)
+        prepaid = admission.reserve(api_key, upload_cost)
+        try:
+            # Off the event loop so queued and rejected requests are answered promptly
+            audio_bytes, info = await run_in_threadpool(pipeline.probe, request.audio_data, trace)
+        except BaseException:
+            admission.unreserve(api_key)
+            raise
         
-        # Step 2: Validate audio
-        if not audio_processor.validate_audio(audio):
-            raise HTTPException(
-                status_code=400, 
-                detail="Invalid audio: file is silent, corrupted, or too short"
+        # The header duration refines the price; only the difference is charged
+        cost, interactive = admission.estimate_cost(
+            len(audio_bytes), info.duration, pipeline.audio_processor.decode_max_length
+        )
+        lap = time.perf_counter()
+        async with admission.admit(api_key, cost, interactive, prepaid=prepaid):
+            pipeline._lap(trace, 'admission', lap)
+            return await run_in_threadpool(
+                profiler.call, pipeline.run_bytes, audio_bytes, request.language,
+                trace=trace, profile=profiler.should_profile(requested), start=start
             )
-        
-        # Step 3: Normalize audio
-        audio = audio_processor.normalize_audio(audio)
-        
-        # Step 4: Extract features
-        logger.info("Extracting audio features")
-        features = feature_extractor.extract_features(audio)
-        
-        # Step 5: Make prediction
-        logger.info("Running inference")
-        classification, confidence, explanation = predictor.predict(features)
-        
-        # Calculate processing time
-        processing_time = (time.time() - start_time) * 1000  # Convert to ms
-        
-        # Build response
-        response = AudioResponse(
-            classification=ClassificationLabel(classification),
-            confidence=round(confidence, 4),
-            explanation=explanation,
-            language=request.language,
-            processing_time_ms=round(processing_time, 2)
+    
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429, detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
         )
         
-        logger.info(f"Classification: {classification}, Confidence: {confidence:.4f}, Time: {processing_time:.2f}ms")
-        
-        return response
-        
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -131,6 +163,76 @@ async def detect_voice(
         logger.error(f"Internal error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(
+    request: JobRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Queue a detection job for background processing
+    
+    Poll **GET /jobs/{job_id}** for the result, or pass **callback_url** to be notified
+    """
+    callback_url = str(request.callback_url) if request.callback_url else None
+    if callback_url:
+        try:
+            # Resolves the host, so run it off the event loop
+            await run_in_threadpool(check_callback_url, callback_url)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        # SQLite calls block (up to the busy timeout), so keep them off the event loop
+        job_id = await run_in_threadpool(job_store.submit, request.audio_data, request.language, callback_url)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return JobResponse(**await run_in_threadpool(job_store.get, job_id))
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """Get status and, once done, the result of a queued job"""
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobResponse(**job)
+
+@app.get("/admin/slow-requests")
+async def slow_requests(
+    limit: int = 50,
+    admin_key: str = Depends(verify_admin_key)
+):
+    """Recent slow or profiled /detect requests with stage timings and audio metadata"""
+    return {
+        "captures": profiler.captures(limit),
+        "stats": profiler.stats()
+    }
+
+@app.delete("/admin/slow-requests")
+async def clear_slow_requests(admin_key: str = Depends(verify_admin_key)):
+    """Empty the slow-request buffer"""
+    profiler.clear()
+    return {"status": "cleared"}
+
+@app.get("/metrics")
+async def metrics(api_key: str = Depends(verify_api_key)):
+    """Runtime counters for model routing, admission and the job queue"""
+    return {
+        "runtime": {
+            "workers": runtime_layout.workers,
+            "threads_per_worker": runtime_layout.threads_per_worker,
+            "worker_index": runtime_layout.worker_index
+        },
+        "models": pipeline.router.stats(),
+        "jobs": {**await run_in_threadpool(job_store.stats), "worker_restarts": job_workers.restarts},
+        "fingerprints": pipeline.fingerprints.stats() if pipeline.fingerprints else None,
+        "admission": admission.stats(),
+        "profiling": profiler.stats()
+    }
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
@@ -140,6 +242,3 @@ async def global_exception_handler(request, exc):
         content={"detail": "Internal server error"}
     )
 
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
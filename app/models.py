@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field, validator
-from typing import Literal
+from pydantic import BaseModel, Field, HttpUrl, validator
+from typing import Literal, Optional
 from enum import Enum
 
+from app.config import get_settings
+
 class ClassificationLabel(str, Enum):
     AI_GENERATED = "AI-generated"
     HUMAN = "Human"
@@ -19,6 +21,11 @@ class AudioRequest(BaseModel):
     @validator('audio_data')
     def validate_base64(cls, v):
         import base64
+        # Size check first so oversized uploads are rejected without being decoded
+        max_file_size = get_settings().MAX_FILE_SIZE
+        # Each trailing '=' is padding, not a decoded byte
+        if len(v) * 3 // 4 - v[-2:].count('=') > max_file_size:
+            raise ValueError(f"Audio file too large. Max size: {max_file_size} bytes")
         try:
             # Try to decode to verify it's valid base64
             base64.b64decode(v, validate=True)
@@ -49,8 +56,36 @@ class AudioResponse(BaseModel):
         ...,
         description="Time taken to process the request"
     )
+    speech_ratio: Optional[float] = Field(
+        None,
+        ge=0.0,
+        le=1.0,
+        description="Fraction of the decoded audio detected as speech"
+    )
 
 class HealthResponse(BaseModel):
     status: str
     model_loaded: bool
     version: str
+
+class JobRequest(AudioRequest):
+    callback_url: Optional[HttpUrl] = Field(
+        None,
+        description="Optional http(s) webhook that receives the job status when it finishes"
+    )
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+    language: str
+    attempts: int = 0
+    result: Optional[AudioResponse] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
@@ -0,0 +1,153 @@
+import time
+import logging
+import numpy as np
+from typing import Optional, Tuple
+
+from app.models import AudioResponse, ClassificationLabel
+from app.audio_processor import AudioProcessor
+from app.feature_extractor import FeatureExtractor
+from app.predictor import PredictorRouter
+from app.fingerprint import FingerprintIndex, compute_fingerprint
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+class DetectionPipeline:
+    """Decode -> validate -> features -> prediction, shared by the API and job workers"""
+    
+    def __init__(self):
+        self.audio_processor = AudioProcessor()
+        self.feature_extractor = FeatureExtractor()
+        self.router = PredictorRouter()
+        self.predictor = self.router.default
+        self.fingerprints = FingerprintIndex() if settings.FINGERPRINT_ENABLED else None
+    
+    @staticmethod
+    def _lap(trace: Optional[dict], stage: str, start: float) -> float:
+        """Record a stage duration in ms into trace['stages'] and return the new start"""
+        now = time.perf_counter()
+        if trace is not None:
+            trace.setdefault('stages', {})[stage] = round((now - start) * 1000, 3)
+        return now
+    
+    def prepare(self, audio_bytes: bytes, trace: Optional[dict] = None) -> np.ndarray:
+        """Decode, validate and peak-normalize one audio file"""
+        metadata = trace.setdefault('audio', {}) if trace is not None else None
+        lap = time.perf_counter()
+        
+        # Step 1: Decode and process audio
+        audio, sr = self.audio_processor.decode_audio_bytes(audio_bytes, metadata)
+        lap = self._lap(trace, 'decode', lap)
+        
+        # Step 2-3: Validate and normalize audio in a single pass
+        is_valid, audio = self.audio_processor.validate_and_normalize(audio)
+        if not is_valid:
+            raise ValueError("Invalid audio: file is silent, corrupted, or too short")
+        self._lap(trace, 'validate', lap)
+        return audio
+    
+    def featurize(self, audio: np.ndarray, trace: Optional[dict] = None) -> Tuple[np.ndarray, float]:
+        """
+        Trim silence and extract features from prepared audio
+        Returns: (feature vector, speech ratio)
+        """
+        lap = time.perf_counter()
+        
+        # Drop silence so the length budget and feature cost go to speech
+        audio, speech_ratio = self.audio_processor.trim_to_speech(audio)
+        lap = self._lap(trace, 'vad', lap)
+        if trace is not None:
+            trace.setdefault('audio', {})['speech_ratio'] = round(speech_ratio, 4)
+        
+        # Step 4: Extract features
+        logger.info("Extracting audio features")
+        features = self.feature_extractor.extract_features(audio)
+        self._lap(trace, 'features', lap)
+        return features, speech_ratio
+    
+    def extract(self, audio_bytes: bytes, trace: Optional[dict] = None) -> Tuple[np.ndarray, float]:
+        """
+        Decode, validate, trim and featurize one audio file
+        Returns: (feature vector, speech ratio)
+        Stage timings and audio metadata are recorded into `trace` when given
+        """
+        return self.featurize(self.prepare(audio_bytes, trace), trace)
+    
+    def decode(self, audio_data: str, trace: Optional[dict] = None) -> bytes:
+        """Base64-decode one clip, enforcing the upload size limit"""
+        lap = time.perf_counter()
+        audio_bytes = self.audio_processor.decode_base64(audio_data)
+        self._lap(trace, 'base64', lap)
+        return audio_bytes
+    
+    def probe(self, audio_data: str, trace: Optional[dict] = None):
+        """
+        Base64-decode one clip and read its header for pricing
+        Returns: (audio_bytes, soundfile info)
+        """
+        audio_bytes = self.decode(audio_data, trace)
+        return audio_bytes, self.audio_processor.probe_audio(audio_bytes)
+    
+    def run(self, audio_data: str, language: str, trace: Optional[dict] = None) -> AudioResponse:
+        """
+        Classify one base64-encoded clip
+        Raises ValueError for audio that cannot be processed
+        """
+        return self.run_bytes(self.decode(audio_data, trace), language, trace)
+    
+    def run_bytes(self, audio_bytes: bytes, language: str, trace: Optional[dict] = None) -> AudioResponse:
+        """Classify one already-decoded audio file"""
+        start_time = time.time()
+        
+        logger.info(f"Processing audio for language: {language}")
+        audio = self.prepare(audio_bytes, trace)
+        
+        # Near-duplicates of an already scored clip reuse its verdict
+        fingerprint = None
+        if self.fingerprints is not None:
+            lap = time.perf_counter()
+            fingerprint = compute_fingerprint(audio, self.audio_processor.sample_rate)
+            cached = self.fingerprints.lookup(fingerprint, language) if fingerprint else None
+            self._lap(trace, 'fingerprint', lap)
+            if cached is not None:
+                if trace is not None:
+                    trace['fingerprint_similarity'] = round(cached['similarity'], 4)
+                return self._response(start_time, language, cached['classification'], cached['confidence'],
+                                      cached['explanation'], cached['speech_ratio'])
+        
+        features, speech_ratio = self.featurize(audio, trace)
+        
+        # Step 5: Make prediction
+        logger.info("Running inference")
+        lap = time.perf_counter()
+        predictor = self.router.get(language)
+        classification, confidence, explanation = predictor.predict(features)
+        self._lap(trace, 'predict', lap)
+        
+        if fingerprint is not None:
+            self.fingerprints.add(fingerprint, language, {
+                'classification': classification,
+                'confidence': confidence,
+                'explanation': explanation,
+                'speech_ratio': speech_ratio,
+            })
+        
+        return self._response(start_time, language, classification, confidence, explanation, speech_ratio)
+    
+    def _response(self, start_time: float, language: str, classification: str, confidence: float,
+                  explanation: str, speech_ratio: float) -> AudioResponse:
+        # Calculate processing time
+        processing_time = (time.time() - start_time) * 1000  # Convert to ms
+        
+        logger.info(f"Classification: {classification}, Confidence: {confidence:.4f}, Time: {processing_time:.2f}ms")
+        
+        return AudioResponse(
+            classification=ClassificationLabel(classification),
+            confidence=round(confidence, 4),
+            explanation=explanation,
+            language=language,
+            processing_time_ms=round(processing_time, 2),
+            speech_ratio=round(speech_ratio, 4)
+        )
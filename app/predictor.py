@@ -1,37 +1,61 @@
 import pickle
+import threading
+import time
 import numpy as np
-from typing import Tuple
-from app.config import get_settings
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.config import get_settings, get_runtime_layout
 import os
 
 settings = get_settings()
 
 class VoicePredictor:
-    def __init__(self):
+    def __init__(self, model_path: str = None, scaler_path: str = None, strict: bool = False):
+        self.model_path = model_path or settings.MODEL_PATH
+        self.scaler_path = scaler_path or settings.SCALER_PATH
+        self.strict = strict
         self.model = None
         self.scaler = None
         self.load_model()
     
     def load_model(self):
-        """Load trained model and scaler"""
+        """
+        Load trained model and scaler; in strict mode failures (including a
+        missing scaler) raise instead of using a dummy or unscaled features
+        """
         try:
-            if os.path.exists(settings.MODEL_PATH):
-                with open(settings.MODEL_PATH, 'rb') as f:
+            if os.path.exists(self.model_path):
+                with open(self.model_path, 'rb') as f:
                     self.model = pickle.load(f)
+            elif self.strict:
+                raise FileNotFoundError(f"Model file not found: {self.model_path}")
             else:
                 print("Warning: Model file not found. Using dummy model.")
                 self.model = self._create_dummy_model()
             
-            if os.path.exists(settings.SCALER_PATH):
-                with open(settings.SCALER_PATH, 'rb') as f:
+            # Pickled estimators may carry n_jobs=-1, which spawns a thread per core per call
+            if hasattr(self.model, 'n_jobs'):
+                self.model.n_jobs = get_runtime_layout().threads_per_worker
+            
+            if os.path.exists(self.scaler_path):
+                with open(self.scaler_path, 'rb') as f:
                     self.scaler = pickle.load(f)
+            elif self.strict:
+                raise FileNotFoundError(f"Scaler file not found: {self.scaler_path}")
             else:
                 print("Warning: Scaler file not found. Features won't be scaled.")
                 
         except Exception as e:
+            if self.strict:
+                raise
             print(f"Error loading model: {e}")
             self.model = self._create_dummy_model()
     
+    @property
+    def memory_bytes(self) -> int:
+        """Approximate resident size, taken from the pickled artifacts on disk"""
+        return sum(os.path.getsize(path) for path in (self.model_path, self.scaler_path) if os.path.exists(path))
+    
     def _create_dummy_model(self):
         """Create a simple dummy model for testing"""
         from sklearn.ensemble import RandomForestClassifier
@@ -51,22 +75,32 @@ class VoicePredictor:
         if len(features.shape) == 1:
             features = features.reshape(1, -1)
         
+        return self.predict_batch(features)[0]
+    
+    def predict_batch(self, features: np.ndarray) -> List[Tuple[str, float, str]]:
+        """
+        Make predictions for a (n_samples, n_features) matrix in one model call
+        Returns: [(classification, confidence, explanation), ...]
+        """
         # Scale features if scaler is available
         if self.scaler is not None:
             features = self.scaler.transform(features)
         
         # Get prediction and probability
-        prediction = self.model.predict(features)[0]
-        probabilities = self.model.predict_proba(features)[0]
-        
-        # Map prediction to label
-        classification = "AI-generated" if prediction == 1 else "Human"
-        confidence = float(probabilities[prediction])
+        probabilities = self.model.predict_proba(features)
+        predictions = self.model.classes_[np.argmax(probabilities, axis=1)]
         
-        # Generate explanation
-        explanation = self._generate_explanation(classification, confidence, features)
+        results = []
+        for row, (prediction, row_probabilities) in enumerate(zip(predictions, probabilities)):
+            # Map prediction to label
+            classification = "AI-generated" if prediction == 1 else "Human"
+            confidence = float(row_probabilities[prediction])
+            
+            # Generate explanation
+            explanation = self._generate_explanation(classification, confidence, features[row])
+            results.append((classification, confidence, explanation))
         
-        return classification, confidence, explanation
+        return results
     
     def _generate_explanation(self, classification: str, confidence: float, features: np.ndarray) -> str:
         """Generate human-readable explanation"""
@@ -92,3 +126,114 @@ class VoicePredictor:
         
         explanation = f"Classified as {classification} with {certainty} ({confidence:.1%}). {reasons[0]}."
         return explanation
+
+class PredictorRouter:
+    """
+    Route languages to specialised models, loading each on first use
+    Resident models are kept in an LRU bounded by count and artifact size;
+    languages without a usable model fall back to the global predictor
+    """
+    
+    def __init__(self, default: VoicePredictor = None, language_models: Dict[str, str] = None,
+                 max_resident: int = None, memory_budget_mb: int = None):
+        self.default = default or VoicePredictor()
+        self.language_models = settings.LANGUAGE_MODELS if language_models is None else language_models
+        self.max_resident = settings.MAX_RESIDENT_MODELS if max_resident is None else max_resident
+        budget_mb = settings.MODEL_MEMORY_BUDGET_MB if memory_budget_mb is None else memory_budget_mb
+        self.memory_budget = budget_mb * 1024 * 1024
+        
+        self._resident = OrderedDict()
+        self._unavailable = set()
+        self._lock = threading.Lock()
+        # One lock per language so a cold load only blocks requests for that language
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.metrics = {
+            'hits': 0,
+            'misses': 0,
+            'fallbacks': 0,
+            'loads': 0,
+            'load_failures': 0,
+            'evictions': 0,
+            'load_time_ms_total': 0.0,
+            'load_time_ms_max': 0.0,
+        }
+    
+    def get(self, language: str) -> VoicePredictor:
+        """Return the predictor for a language, loading or evicting models as needed"""
+        artifact_dir = self.language_models.get(language)
+        if artifact_dir is None or language in self._unavailable:
+            self.metrics['fallbacks'] += 1
+            return self.default
+        
+        with self._lock:
+            predictor = self._resident.get(language)
+            if predictor is not None:
+                self._resident.move_to_end(language)
+                self.metrics['hits'] += 1
+                return predictor
+            self.metrics['misses'] += 1
+            load_lock = self._load_locks.setdefault(language, threading.Lock())
+        
+        # Unpickling happens outside the router lock; concurrent misses for the same language wait here
+        with load_lock:
+            with self._lock:
+                predictor = self._resident.get(language)
+                if predictor is not None:
+                    self._resident.move_to_end(language)
+                    return predictor
+            
+            predictor = None if language in self._unavailable else self._load(language, artifact_dir)
+            with self._lock:
+                if predictor is None:
+                    self.metrics['fallbacks'] += 1
+                    return self.default
+                self._resident[language] = predictor
+                self._evict()
+            return predictor
+    
+    def _load(self, language: str, artifact_dir: str) -> Optional[VoicePredictor]:
+        start = time.perf_counter()
+        try:
+            predictor = VoicePredictor(
+                model_path=os.path.join(artifact_dir, 'classifier.pkl'),
+                scaler_path=os.path.join(artifact_dir, 'scaler.pkl'),
+                strict=True
+            )
+        except Exception as e:
+            print(f"Error loading {language} model from {artifact_dir}: {e}. Using global model.")
+            with self._lock:
+                self._unavailable.add(language)
+                self.metrics['load_failures'] += 1
+            return None
+        
+        load_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.metrics['loads'] += 1
+            self.metrics['load_time_ms_total'] += load_ms
+            self.metrics['load_time_ms_max'] = max(self.metrics['load_time_ms_max'], load_ms)
+        return predictor
+    
+    def _resident_bytes(self) -> int:
+        return sum(predictor.memory_bytes for predictor in self._resident.values())
+    
+    def _evict(self):
+        """Drop least recently used models until both limits hold (the newest always stays)"""
+        while len(self._resident) > 1 and (
+            len(self._resident) > self.max_resident or self._resident_bytes() > self.memory_budget
+        ):
+            self._resident.popitem(last=False)
+            self.metrics['evictions'] += 1
+    
+    def stats(self) -> dict:
+        """Routing counters, load latency and current residency"""
+        with self._lock:
+            resident = {language: predictor.memory_bytes for language, predictor in self._resident.items()}
+        loads = self.metrics['loads']
+        return {
+            **self.metrics,
+            'load_time_ms_avg': self.metrics['load_time_ms_total'] / loads if loads else 0.0,
+            'resident': resident,
+            'resident_bytes': sum(resident.values()),
+            'max_resident': self.max_resident,
+            'memory_budget_bytes': self.memory_budget,
+        }
@@ -0,0 +1,96 @@
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+class RequestProfiler:
+    """
+    Optional cProfile sampling for /detect plus a bounded ring buffer of
+    slow-request captures; when nothing is sampled only a timer is paid
+    """
+    
+    def __init__(self):
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE
+        self.slow_request_ms = settings.SLOW_REQUEST_MS
+        self.top_n = settings.PROFILE_TOP_N
+        self._captures = deque(maxlen=settings.SLOW_REQUEST_BUFFER)
+        self._lock = threading.Lock()
+        self.metrics = {
+            'requests': 0,
+            'profiled': 0,
+            'captured': 0,
+        }
+    
+    def should_profile(self, requested: bool = False) -> bool:
+        """Profile on explicit request or for a random PROFILE_SAMPLE_RATE share of traffic"""
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+    
+    def call(self, fn: Callable, *args, trace: dict, profile: bool = False,
+             start: Optional[float] = None, **kwargs):
+        """
+        Run fn(*args, trace=trace, **kwargs), optionally under cProfile, and
+        capture the trace if the call was profiled or slow (failures included)
+        A perf_counter `start` makes the slow check cover work done before fn
+        """
+        profiler = cProfile.Profile() if profile else None
+        error = None
+        start = time.perf_counter() if start is None else start
+        if profiler is not None:
+            profiler.enable()
+        try:
+            return fn(*args, trace=trace, **kwargs)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            total_ms = (time.perf_counter() - start) * 1000
+            self.metrics['requests'] += 1
+            if profiler is not None or total_ms >= self.slow_request_ms:
+                self._capture(trace, total_ms, profiler, error)
+    
+    def _capture(self, trace: dict, total_ms: float, profiler: Optional[cProfile.Profile], error: Optional[str]):
+        capture = {
+            'timestamp': time.time(),
+            'total_ms': round(total_ms, 3),
+            'slow': total_ms >= self.slow_request_ms,
+            'error': error,
+            **trace,
+            'profile': None,
+        }
+        if profiler is not None:
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(self.top_n)
+            capture['profile'] = stream.getvalue()
+            self.metrics['profiled'] += 1
+        
+        with self._lock:
+            self._captures.append(capture)
+            self.metrics['captured'] += 1
+    
+    def captures(self, limit: Optional[int] = None) -> List[dict]:
+        """Most recent captures first"""
+        with self._lock:
+            items = list(reversed(self._captures))
+        return items[:limit] if limit else items
+    
+    def clear(self):
+        with self._lock:
+            self._captures.clear()
+    
+    def stats(self) -> dict:
+        return {
+            **self.metrics,
+            'buffered': len(self._captures),
+            'sample_rate': self.sample_rate,
+            'slow_request_ms': self.slow_request_ms,
+        }
@@ -0,0 +1,230 @@
+"""
+Micro-benchmarks for the audio pipeline
+Run from the project root: python scripts/benchmark_audio.py [--suite NAME ...]
+"""
+
+import argparse
+import base64
+import io
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import tracemalloc
+import librosa
+import numpy as np
+import soundfile as sf
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.audio_processor import AudioProcessor
+from app.feature_extractor import FeatureExtractor
+from app.config import get_settings, available_cores, THREAD_ENV_VARS
+
+settings = get_settings()
+processor = AudioProcessor()
+extractor = FeatureExtractor()
+
+def make_audio(duration, dtype, sample_rate=settings.SAMPLE_RATE):
+    """Create a noisy tone of the given duration"""
+    rng = np.random.default_rng(0)
+    n = int(sample_rate * duration)
+    t = np.arange(n) / sample_rate
+    audio = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(n)
+    return audio.astype(dtype)
+
+def measure(fn, make_input, repeats=20):
+    """Return (median latency in ms, peak traced allocation in bytes)"""
+    timings = []
+    for _ in range(repeats):
+        audio = make_input()
+        start = time.perf_counter()
+        fn(audio)
+        timings.append((time.perf_counter() - start) * 1000)
+    
+    audio = make_input()
+    tracemalloc.start()
+    fn(audio)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return float(np.median(timings)), peak
+
+def legacy_validate_normalize(audio):
+    """The original separate validate_audio + normalize_audio passes"""
+    if np.max(np.abs(audio)) < 0.001:
+        return False, audio
+    if np.any(np.isnan(audio)) or np.any(np.isinf(audio)):
+        return False, audio
+    max_val = np.max(np.abs(audio))
+    return True, audio / max_val
+
+def benchmark_validate(duration):
+    print("\n" + "=" * 60)
+    print(f"Validate + normalize ({duration:.0f}s clip)")
+    print("=" * 60)
+    print(f"{'variant':<28}{'dtype':<10}{'median ms':>12}{'peak KiB':>12}")
+    
+    for dtype in (np.float64, np.float32):
+        base = make_audio(duration, dtype)
+        for name, fn in (
+            ("legacy (5 passes)", legacy_validate_normalize),
+            ("fused in-place", processor.validate_and_normalize),
+        ):
+            ms, peak = measure(fn, base.copy)
+            print(f"{name:<28}{np.dtype(dtype).name:<10}{ms:>12.3f}{peak / 1024:>12.1f}")
+
+def available_memory():
+    """MemAvailable from /proc/meminfo in bytes, or None off Linux"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def run_request(payload):
+    """Decode, validate and extract features the way /detect does"""
+    audio, _ = processor.decode_base64_audio(payload)
+    _, audio = processor.validate_and_normalize(audio)
+    return extractor.extract_features(audio)
+
+def benchmark_dtype(duration):
+    print("\n" + "=" * 60)
+    print(f"End-to-end request, 44.1kHz stereo WAV ({duration:.0f}s clip)")
+    print("=" * 60)
+    
+    audio = make_audio(duration, np.float64, sample_rate=44100)
+    audio_io = io.BytesIO()
+    sf.write(audio_io, np.stack([audio, audio], axis=1), 44100, format='WAV', subtype='PCM_16')
+    payload = base64.b64encode(audio_io.getvalue()).decode('utf-8')
+    
+    mem_available = available_memory()
+    print(f"{'dtype':<10}{'median ms':>12}{'peak MiB':>12}{'requests/GiB':>14}{'headroom':>10}")
+    
+    results = {}
+    for dtype in ("float64", "float32"):
+        processor.dtype = extractor.dtype = np.dtype(dtype)
+        ms, peak = measure(run_request, lambda: payload, repeats=5)
+        results[dtype] = run_request(payload)
+        headroom = f"{mem_available // peak}" if mem_available else "n/a"
+        print(f"{dtype:<10}{ms:>12.1f}{peak / 2**20:>12.1f}{2**30 / peak:>14.1f}{headroom:>10}")
+    
+    processor.dtype = extractor.dtype = np.dtype(settings.AUDIO_DTYPE)
+    
+    rel_err = np.abs(results["float32"] - results["float64"]) / (np.abs(results["float64"]) + 1e-6)
+    print(f"\n[INFO] Max relative feature difference float32 vs float64: {rel_err.max():.2e}")
+    print("[INFO] headroom = concurrent requests that fit in MemAvailable at peak usage")
+
+def benchmark_fft(duration):
+    print("\n" + "=" * 60)
+    print(f"STFT / feature extraction by FFT backend ({duration:.0f}s clip, {extractor.dtype.name})")
+    print("=" * 60)
+    
+    audio = make_audio(duration, extractor.dtype)
+    ms, _ = measure(lambda y: librosa.stft(y, n_fft=extractor.n_fft, hop_length=extractor.hop_length), lambda: audio, repeats=10)
+    print(f"[INFO] librosa.stft reference: {ms:.1f} ms")
+    print(f"{'backend':<10}{'workers':>8}{'stft ms':>10}{'features ms':>13}{'speedup':>9}")
+    
+    cores = os.cpu_count() or 1
+    layouts = [("numpy", 1), ("scipy", 1)] + ([("scipy", cores)] if cores > 1 else []) + [("pyfftw", cores)]
+    
+    baseline = None
+    for backend, workers in layouts:
+        if backend == "pyfftw":
+            try:
+                import pyfftw  # noqa: F401
+            except ImportError:
+                print(f"{backend:<10}{'-':>8}  (not installed, skipped)")
+                continue
+        extractor.set_fft_backend(backend, workers)
+        stft_ms, _ = measure(extractor._stft_magnitude, lambda: audio, repeats=10)
+        features_ms, _ = measure(extractor.extract_features, lambda: audio, repeats=5)
+        baseline = baseline or stft_ms
+        print(f"{backend:<10}{workers:>8}{stft_ms:>10.1f}{features_ms:>13.1f}{baseline / stft_ms:>8.2f}x")
+    
+    extractor.set_fft_backend(settings.FFT_BACKEND, settings.FFT_WORKERS)
+
+def make_silence_heavy_audio(duration, speech_fraction):
+    """Voiced bursts separated by near-silence, like a call with long holds"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(settings.SAMPLE_RATE * duration)) / settings.SAMPLE_RATE
+    voiced = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6))
+    voiced *= 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    audio = np.where(t % 10 < 10 * speech_fraction, voiced, 0.0) + 1e-3 * rng.standard_normal(len(t))
+    return (audio / np.max(np.abs(audio))).astype(extractor.dtype)
+
+def benchmark_vad(duration):
+    print("\n" + "=" * 60)
+    print(f"VAD trimming before feature extraction ({duration:.0f}s clip)")
+    print("=" * 60)
+    print(f"{'speech %':<10}{'vad ms':>8}{'features ms':>13}{'no-vad ms':>11}{'cpu saved':>11}")
+    
+    vad = AudioProcessor()
+    vad.vad_aggressiveness = vad.vad_aggressiveness or 1
+    for speech_fraction in (0.1, 0.25, 0.5, 1.0):
+        audio = make_silence_heavy_audio(duration, speech_fraction)
+        vad_ms, _ = measure(vad.trim_to_speech, lambda: audio, repeats=10)
+        trimmed, speech_ratio = vad.trim_to_speech(audio)
+        features_ms, _ = measure(extractor.extract_features, lambda: trimmed, repeats=5)
+        full_ms, _ = measure(extractor.extract_features, lambda: audio, repeats=5)
+        saved = 1 - (vad_ms + features_ms) / full_ms
+        print(f"{speech_ratio * 100:<10.0f}{vad_ms:>8.1f}{features_ms:>13.1f}{full_ms:>11.1f}{saved * 100:>10.0f}%")
+
+_layout_predictor = None
+
+def _init_layout_worker(threads):
+    """Apply one worker's thread limits, as configure_runtime would"""
+    global _layout_predictor
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=threads)
+    
+    from app.predictor import VoicePredictor
+    extractor.set_fft_backend(settings.FFT_BACKEND, threads)
+    _layout_predictor = VoicePredictor()
+    if hasattr(_layout_predictor.model, 'n_jobs'):
+        _layout_predictor.model.n_jobs = threads
+
+def _score_clip(audio):
+    return _layout_predictor.predict(extractor.extract_features(audio))[0]
+
+def benchmark_threads(duration, clips_per_core=4):
+    cores = len(available_cores())
+    print("\n" + "=" * 60)
+    print(f"Worker/thread layouts on {cores} cores ({duration:.0f}s clips)")
+    print("=" * 60)
+    
+    layouts = {(workers, max(1, cores // workers)) for workers in (1, 2, 4, 8, 16, 32) if workers <= cores}
+    layouts.add((cores, cores))  # every worker using every core: oversubscribed
+    audio = make_audio(duration, extractor.dtype)
+    clips = clips_per_core * cores
+    
+    print(f"{'workers':>8}{'threads':>9}{'clips/s':>10}{'note':>16}")
+    ctx = multiprocessing.get_context("spawn")
+    for workers, threads in sorted(layouts):
+        with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_layout_worker, initargs=(threads,)) as pool:
+            list(pool.map(_score_clip, [audio] * workers))  # warm up every worker
+            start = time.perf_counter()
+            list(pool.map(_score_clip, [audio] * clips))
+            elapsed = time.perf_counter() - start
+        note = "oversubscribed" if workers * threads > cores else ""
+        print(f"{workers:>8}{threads:>9}{clips / elapsed:>10.2f}{note:>16}")
+
+SUITES = {
+    "validate": lambda: benchmark_validate(settings.MAX_AUDIO_LENGTH),
+    "dtype": lambda: benchmark_dtype(settings.MAX_AUDIO_LENGTH),
+    "fft": lambda: benchmark_fft(settings.MAX_AUDIO_LENGTH),
+    "vad": lambda: benchmark_vad(settings.MAX_AUDIO_LENGTH),
+    "threads": lambda: benchmark_threads(10),
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--suite", nargs="+", choices=sorted(SUITES), default=list(SUITES))
+    for name in parser.parse_args().suite:
+        SUITES[name]()
@@ -0,0 +1,279 @@
+"""
+Offline bulk scorer: runs the detection pipeline directly over audio files
+without the HTTP API
+
+Usage (from the project root):
+    python scripts/score_audio.py archive/ -o scores.csv
+    python scripts/score_audio.py manifest.csv -o scores.jsonl --workers 8
+
+A manifest is a CSV with a `path` column and an optional `language` column.
+Existing rows in the output are skipped, so an interrupted run resumes
+where it stopped. With --retry-errors, files whose row records an error are
+scored again and the new row is appended (the last row for a path wins).
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import numpy as np
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import available_cores, configure_runtime, get_runtime_layout, get_settings
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".aiff", ".aif"}
+LANGUAGES = ("Tamil", "English", "Hindi", "Malayalam", "Telugu")
+OUTPUT_FIELDS = ["path", "language", "classification", "confidence", "speech_ratio", "error"]
+
+_pipeline = None
+
+def process_threads(workers):
+    """Native threads per scoring process; unlike the server there are no job processes sharing the cores"""
+    return get_settings().THREADS_PER_WORKER or max(1, len(available_cores()) // max(1, workers))
+
+def _init_worker(threads=None):
+    """Build one pipeline per process with this worker's thread limits"""
+    global _pipeline
+    configure_runtime(threads)
+    from app.pipeline import DetectionPipeline
+    _pipeline = DetectionPipeline()
+
+def score_batch(batch):
+    """
+    Featurize a batch of (path, language, audio bytes or read error) and
+    classify it with one model call per language
+    """
+    rows = []
+    pending = defaultdict(list)
+    for path, language, audio_bytes, read_error in batch:
+        row = {"path": path, "language": language, "classification": None,
+               "confidence": None, "speech_ratio": None, "error": read_error}
+        rows.append(row)
+        if read_error:
+            continue
+        try:
+            features, speech_ratio = _pipeline.extract(audio_bytes)
+        except ValueError as e:
+            row["error"] = str(e)
+            continue
+        except Exception as e:
+            # One bad clip must not take the rest of the batch (and the run) down with it
+            row["error"] = f"Internal error: {e}"
+            continue
+        row["speech_ratio"] = round(speech_ratio, 4)
+        pending[language].append((row, features))
+    
+    for language, items in pending.items():
+        try:
+            predictor = _pipeline.router.get(language)
+            results = predictor.predict_batch(np.stack([features for _, features in items]))
+        except Exception as e:
+            for row, _ in items:
+                row["error"] = f"Internal error: {e}"
+            continue
+        for (row, _), (classification, confidence, _) in zip(items, results):
+            row["classification"] = classification
+            row["confidence"] = round(confidence, 4)
+    return rows
+
+def list_inputs(source, default_language):
+    """(path, language) pairs from a directory tree or a CSV manifest"""
+    if os.path.isdir(source):
+        items = []
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                    items.append((os.path.join(root, name), default_language))
+        return sorted(items)
+    
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, newline="") as f:
+        reader = csv.DictReader(f)
+        if "path" not in (reader.fieldnames or []):
+            raise SystemExit(f"Manifest {source} needs a 'path' column")
+        items = []
+        for record in reader:
+            language = record.get("language") or default_language
+            if language not in LANGUAGES:
+                raise SystemExit(f"Unsupported language '{language}' for {record['path']}")
+            items.append((os.path.join(base_dir, record["path"]), language))
+        return items
+
+class OutputWriter:
+    """Append-only CSV or JSONL output; rows already present mark work as done"""
+    
+    def __init__(self, path, overwrite=False, retry_errors=False):
+        self.path = path
+        self.retry_errors = retry_errors
+        self.jsonl = path.endswith(".jsonl")
+        if not overwrite:
+            self._drop_partial_line()
+        self.done = set() if overwrite else self._read_done()
+        exists = os.path.exists(path) and os.path.getsize(path) > 0 and not overwrite
+        self.file = open(path, "a" if exists else "w", newline="")
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.file, fieldnames=OUTPUT_FIELDS)
+            if not exists:
+                self.writer.writeheader()
+    
+    def _drop_partial_line(self):
+        """Cut the unterminated last row an interrupted run may have left behind"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                return
+            pos = end
+            while pos > 0:
+                step = min(65536, pos)
+                pos -= step
+                f.seek(pos)
+                newline = f.read(step).rfind(b"\n")
+                if newline >= 0:
+                    f.truncate(pos + newline + 1)
+                    return
+            f.truncate(0)
+    
+    def _read_done(self):
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, newline="") as f:
+            if self.jsonl:
+                rows = [json.loads(line) for line in f if line.strip()]
+            else:
+                rows = list(csv.DictReader(f))
+        return {row["path"] for row in rows if not (self.retry_errors and row.get("error"))}
+    
+    def write(self, rows):
+        for row in rows:
+            if self.jsonl:
+                self.file.write(json.dumps(row) + "\n")
+            else:
+                self.writer.writerow(row)
+        self.file.flush()
+    
+    def close(self):
+        self.file.close()
+
+class Progress:
+    """Periodic throughput report on stderr"""
+    
+    def __init__(self, total, interval):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.errors = 0
+        self.start = self.last_report = time.perf_counter()
+    
+    def update(self, rows, force=False):
+        self.done += len(rows)
+        self.errors += sum(1 for row in rows if row["error"])
+        now = time.perf_counter()
+        if not force and now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        eta = remaining / rate if rate > 0 else 0.0
+        percent = 100.0 * self.done / self.total if self.total else 100.0
+        print(f"[INFO] {self.done}/{self.total} clips ({percent:.1f}%) "
+              f"{rate:.1f} clips/s, {self.errors} errors, ETA {eta:.0f}s", file=sys.stderr)
+
+def read_file(item):
+    path, language = item
+    try:
+        with open(path, "rb") as f:
+            return path, language, f.read(), None
+    except OSError as e:
+        return path, language, None, f"Error reading file: {e}"
+
+def prefetch_batches(items, batch_size, io_threads):
+    """Read files on a thread pool, keeping a bounded window of reads in flight"""
+    with ThreadPoolExecutor(io_threads) as pool:
+        window = io_threads * 2
+        futures = [pool.submit(read_file, item) for item in items[:window]]
+        next_item = window
+        batch = []
+        while futures:
+            batch.append(futures.pop(0).result())
+            if next_item < len(items):
+                futures.append(pool.submit(read_file, items[next_item]))
+                next_item += 1
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+def score(items, writer, progress, workers, batch_size, io_threads):
+    batches = prefetch_batches(items, batch_size, io_threads)
+    threads = process_threads(workers)
+    
+    if workers == 0:
+        # In-process mode for debugging and small runs
+        _init_worker(threads)
+        for batch in batches:
+            rows = score_batch(batch)
+            writer.write(rows)
+            progress.update(rows)
+        return
+    
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(threads,)) as pool:
+        in_flight = set()
+        for batch in batches:
+            in_flight.add(pool.submit(score_batch, batch))
+            # Two batches per worker keeps processes busy without buffering the archive
+            if len(in_flight) >= workers * 2:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    rows = future.result()
+                    writer.write(rows)
+                    progress.update(rows)
+        for future in in_flight:
+            rows = future.result()
+            writer.write(rows)
+            progress.update(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a directory or CSV manifest of audio files")
+    parser.add_argument("source", help="Directory of audio files or CSV manifest with path[,language]")
+    parser.add_argument("-o", "--output", required=True, help="Output file (.csv or .jsonl)")
+    parser.add_argument("--language", default="English", choices=LANGUAGES,
+                        help="Language for files without one in the manifest")
+    parser.add_argument("--workers", type=int, default=get_runtime_layout().workers,
+                        help="Scoring processes (0 runs in this process)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Clips per model call")
+    parser.add_argument("--io-threads", type=int, default=4, help="Threads prefetching file reads")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress reports")
+    parser.add_argument("--overwrite", action="store_true", help="Start over instead of resuming")
+    parser.add_argument("--retry-errors", action="store_true", help="When resuming, rescore files whose row has an error")
+    args = parser.parse_args(argv)
+    
+    items = list_inputs(args.source, args.language)
+    writer = OutputWriter(args.output, overwrite=args.overwrite, retry_errors=args.retry_errors)
+    todo = [item for item in items if item[0] not in writer.done]
+    print(f"[INFO] {len(items)} clips found, {len(items) - len(todo)} already scored, "
+          f"{len(todo)} to go with {args.workers} workers", file=sys.stderr)
+    
+    progress = Progress(len(todo), args.progress_interval)
+    try:
+        score(todo, writer, progress, args.workers, args.batch_size, args.io_threads)
+    finally:
+        writer.close()
+        progress.update([], force=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import pytest
+import asyncio
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import main
+from app.admission import AdmissionController, AdmissionRejected
+from app.config import get_settings
+from tests.test_api import create_dummy_audio_base64
+
+settings = get_settings()
+client = TestClient(main.app)
+
+def run(coro):
+    return asyncio.run(coro)
+
+class TestAdmissionController:
+    def test_cost_estimate_and_priority(self):
+        """Test cost grows with duration and long clips are treated as bulk"""
+        admission = AdmissionController(max_concurrency=2)
+        short_cost, short_interactive = admission.estimate_cost(32000, 1.0, 60)
+        long_cost, long_interactive = admission.estimate_cost(32000, 45.0, 60)
+        assert short_interactive and not long_interactive
+        assert long_cost > short_cost
+        # Duration is capped at what would actually be decoded
+        assert admission.estimate_cost(32000, 600.0, 60)[0] == admission.estimate_cost(32000, 60.0, 60)[0]
+    
+    def test_key_rate_limit_sets_retry_after(self):
+        """Test a key that spent its budget is rejected with a retry hint"""
+        admission = AdmissionController(max_concurrency=2, cost_per_second=1.0, burst=3.0)
+        
+        async def scenario():
+            async with admission.admit("a", 2.0, True):
+                pass
+            with pytest.raises(AdmissionRejected) as exc:
+                await admission.acquire("a", 2.0, True)
+            # Other keys have their own budget
+            async with admission.admit("b", 2.0, True):
+                pass
+            return exc.value
+        
+        rejected = run(scenario())
+        assert rejected.reason == "key_rate"
+        assert 0.5 < rejected.retry_after <= 1.0
+        assert admission.stats()["rejected"]["key_rate"] == 1
+    
+    def test_prepaid_reservation_charges_the_difference(self):
+        """Test a reserved request is only charged the rest of its refined cost"""
+        admission = AdmissionController(max_concurrency=2, key_concurrency=1, cost_per_second=0.01, burst=10.0)
+        
+        async def scenario():
+            prepaid = admission.reserve("a", 1.0)
+            # The reservation already counts against the key's concurrency
+            with pytest.raises(AdmissionRejected):
+                admission.reserve("a", 1.0)
+            async with admission.admit("a", 4.0, True, prepaid=prepaid):
+                pass
+        
+        run(scenario())
+        assert 5.9 < admission._keys["a"].bucket.tokens < 6.1
+        assert admission.stats()["rejected"]["key_concurrency"] == 1
+        assert admission._keys["a"].in_flight == 0
+    
+    def test_key_concurrency_limit(self):
+        """Test one key cannot hold more than its concurrent requests"""
+        admission = AdmissionController(max_concurrency=4, key_concurrency=1)
+        
+        async def scenario():
+            await admission.acquire("a", 1.0, True)
+            with pytest.raises(AdmissionRejected) as exc:
+                await admission.acquire("a", 1.0, True)
+            admission.release("a")
+            return exc.value
+        
+        assert run(scenario()).reason == "key_concurrency"
+        assert admission.stats()["in_flight"] == 0
+    
+    def test_interactive_requests_jump_the_queue(self):
+        """Test waiting interactive clips get freed slots before earlier bulk clips"""
+        admission = AdmissionController(max_concurrency=2)
+        order = []
+        
+        async def request(key, interactive):
+            async with admission.admit(key, 1.0, interactive):
+                order.append(key)
+        
+        async def scenario():
+            await admission.acquire("holder", 1.0, True)
+            # The reserved slot keeps bulk work waiting even though one slot is free
+            bulk = asyncio.create_task(request("bulk", False))
+            await asyncio.sleep(0)
+            interactive = asyncio.create_task(request("interactive", True))
+            await asyncio.sleep(0.01)
+            assert order == ["interactive"]
+            assert admission.stats()["queue_depth"] == 1
+            admission.release("holder")
+            await asyncio.gather(bulk, interactive)
+        
+        run(scenario())
+        assert order == ["interactive", "bulk"]
+        assert admission.stats()["in_flight"] == 0
+    
+    def test_queue_full_and_timeout_shed_load(self, monkeypatch):
+        """Test requests are shed once the wait queue is full or the wait is too long"""
+        monkeypatch.setattr(settings, "ADMISSION_MAX_QUEUE", 1)
+        monkeypatch.setattr(settings, "ADMISSION_QUEUE_TIMEOUT", 0.05)
+        admission = AdmissionController(max_concurrency=1)
+        
+        async def scenario():
+            await admission.acquire("a", 1.0, True)
+            waiting = asyncio.create_task(admission.acquire("b", 1.0, True))
+            await asyncio.sleep(0)
+            with pytest.raises(AdmissionRejected) as full:
+                await admission.acquire("c", 1.0, True)
+            with pytest.raises(AdmissionRejected) as timeout:
+                await waiting
+            return full.value, timeout.value
+        
+        full, timeout = run(scenario())
+        assert full.reason == "queue_full"
+        assert timeout.reason == "queue_timeout"
+        stats = admission.stats()
+        assert stats["queue_depth"] == 0
+        assert stats["in_flight"] == 1
+
+class TestAdmissionAPI:
+    def test_rejected_request_gets_429(self, monkeypatch):
+        """Test /detect sheds an over-budget key with 429 and Retry-After"""
+        monkeypatch.setattr(main, "admission", AdmissionController(cost_per_second=0.01, burst=2.0))
+        headers = {"Authorization": f"Bearer {settings.API_KEY}"}
+        payload = {"audio_data": create_dummy_audio_base64(), "language": "English"}
+        
+        assert client.post("/detect", json=payload, headers=headers).status_code == 200
+        response = client.post("/detect", json=payload, headers=headers)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        
+        stats = client.get("/metrics", headers=headers).json()["admission"]
+        assert stats["admitted"] == 1
+        assert stats["rejected"]["key_rate"] == 1
+    
+    def test_rejected_request_is_not_decoded(self, monkeypatch):
+        """Test an over-budget key is turned away before its upload is decoded"""
+        monkeypatch.setattr(main, "admission", AdmissionController(cost_per_second=0.01, burst=2.0))
+        headers = {"Authorization": f"Bearer {settings.API_KEY}"}
+        payload = {"audio_data": create_dummy_audio_base64(), "language": "English"}
+        assert client.post("/detect", json=payload, headers=headers).status_code == 200
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("rejected request was decoded")
+        
+        monkeypatch.setattr(main.pipeline, "probe", fail)
+        assert client.post("/detect", json=payload, headers=headers).status_code == 429
+    
+    def test_additional_api_keys(self, monkeypatch):
+        """Test keys listed in API_KEYS are accepted"""
+        monkeypatch.setattr(settings, "API_KEYS", ["partner-key"])
+        response = client.get("/metrics", headers={"Authorization": "Bearer partner-key"})
+        assert response.status_code == 200
+        assert client.get("/metrics", headers={"Authorization": "Bearer other"}).status_code == 403
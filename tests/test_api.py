@@ -12,6 +12,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from app.main import app
 from app.config import get_settings
+from app.models import AudioRequest
 
 settings = get_settings()
 client = TestClient(app)
@@ -120,6 +121,34 @@ class TestAPI:
         )
         assert response.status_code == 422  # Validation error
     
+    def test_oversized_payload_is_not_decoded(self, monkeypatch):
+        """Test an upload over MAX_FILE_SIZE is rejected during validation, before any base64 decoding"""
+        audio_base64 = create_dummy_audio_base64()
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE", len(audio_base64) // 2)
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("oversized payload was decoded")
+        monkeypatch.setattr(base64, "b64decode", fail)
+        
+        response = client.post(
+            "/detect",
+            json={"audio_data": audio_base64, "language": "English"},
+            headers={"Authorization": f"Bearer {settings.API_KEY}"}
+        )
+        assert response.status_code == 422
+        assert "too large" in response.text
+    
+    def test_payload_at_size_limit_is_accepted(self, monkeypatch):
+        """Test a file of exactly MAX_FILE_SIZE bytes passes validation despite base64 padding"""
+        audio_bytes = base64.b64decode(create_dummy_audio_base64())
+        audio_bytes += b"\x00" * ((1 - len(audio_bytes)) % 3)
+        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
+        assert audio_base64.endswith("==")
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE", len(audio_bytes))
+        
+        request = AudioRequest(audio_data=audio_base64, language="English")
+        assert request.audio_data == audio_base64
+    
     def test_invalid_language(self):
         """Test with invalid language"""
         audio_base64 = create_dummy_audio_base64()
@@ -132,3 +161,12 @@ class TestAPI:
             headers={"Authorization": f"Bearer {settings.API_KEY}"}
         )
         assert response.status_code == 422  # Validation error
+    
+    def test_metrics(self):
+        """Test runtime metrics are exposed behind authentication"""
+        assert client.get("/metrics").status_code == 401
+        response = client.get("/metrics", headers={"Authorization": f"Bearer {settings.API_KEY}"})
+        assert response.status_code == 200
+        data = response.json()
+        assert "resident" in data["models"]
+        assert "queued" in data["jobs"]
@@ -0,0 +1,172 @@
+import pytest
+import base64
+import numpy as np
+import soundfile as sf
+import io
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.audio_processor import AudioProcessor
+from app.config import get_settings
+
+settings = get_settings()
+processor = AudioProcessor()
+
+def create_silence_heavy_audio(duration=40.0, speech_fraction=0.25, sample_rate=16000):
+    """Voiced bursts at the start of every 10 s block over a faint noise floor"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    voiced = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6))
+    voiced *= 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    audio = np.where(t % 10 < 10 * speech_fraction, voiced, 0.0) + 1e-3 * rng.standard_normal(len(t))
+    return (audio / np.max(np.abs(audio))).astype(np.float32)
+
+def create_audio_bytes(duration=1.0, sample_rate=16000, channels=1, format='WAV'):
+    """Create an in-memory audio file containing a sine wave"""
+    t = np.linspace(0, duration, int(sample_rate * duration))
+    audio = np.sin(2 * np.pi * 440 * t) * 0.5
+    if channels > 1:
+        audio = np.stack([audio] * channels, axis=1)
+    
+    audio_io = io.BytesIO()
+    sf.write(audio_io, audio, sample_rate, format=format)
+    return audio_io.getvalue()
+
+class TestAudioProcessor:
+    def test_probe_reads_header(self):
+        """Test header sniffing reports container metadata"""
+        info = processor.probe_audio(create_audio_bytes(duration=2.0, sample_rate=22050, channels=2))
+        assert info.format == "WAV"
+        assert info.samplerate == 22050
+        assert info.channels == 2
+        assert info.duration == pytest.approx(2.0, abs=1e-3)
+    
+    def test_probe_rejects_garbage(self):
+        """Test unsupported payloads are rejected from the header alone"""
+        with pytest.raises(ValueError):
+            processor.probe_audio(b"not an audio file" * 100)
+    
+    def test_decode_rejects_garbage(self):
+        """Test decode surfaces corrupt payloads as ValueError"""
+        payload = base64.b64encode(b"\x00\x01garbage" * 64).decode('utf-8')
+        with pytest.raises(ValueError):
+            processor.decode_base64_audio(payload)
+    
+    def test_decode_rejects_oversized_payload(self):
+        """Test oversized payloads are rejected before decoding"""
+        payload = "A" * (settings.MAX_FILE_SIZE * 4 // 3 + 8)
+        with pytest.raises(ValueError, match="too large"):
+            processor.decode_base64_audio(payload)
+    
+    def test_decode_accepts_payload_at_size_limit(self, monkeypatch):
+        """Test base64 padding is not counted toward the size limit"""
+        audio_bytes = create_audio_bytes()
+        audio_bytes += b"\x00" * ((1 - len(audio_bytes)) % 3)
+        payload = base64.b64encode(audio_bytes).decode('utf-8')
+        assert payload.endswith("==")
+        monkeypatch.setattr(processor, "max_file_size", len(audio_bytes))
+        assert processor.decode_base64(payload) == audio_bytes
+        monkeypatch.setattr(processor, "max_file_size", len(audio_bytes) - 1)
+        with pytest.raises(ValueError, match="too large"):
+            processor.decode_base64(payload)
+    
+    def test_decode_truncates_to_decode_limit(self):
+        """Test long audio is cut to the raw decode limit"""
+        audio_bytes = create_audio_bytes(duration=processor.decode_max_length + 5, sample_rate=8000)
+        payload = base64.b64encode(audio_bytes).decode('utf-8')
+        audio, sr = processor.decode_base64_audio(payload)
+        assert sr == settings.SAMPLE_RATE
+        assert len(audio) == settings.SAMPLE_RATE * processor.decode_max_length
+    
+    def test_decode_stereo_to_mono(self):
+        """Test multichannel input is downmixed"""
+        payload = base64.b64encode(create_audio_bytes(channels=2)).decode('utf-8')
+        audio, sr = processor.decode_base64_audio(payload)
+        assert audio.ndim == 1
+        assert len(audio) == settings.SAMPLE_RATE
+    
+    def test_validate_and_normalize_in_place(self):
+        """Test fused routine normalizes float32 buffers without copying"""
+        audio = (np.sin(np.linspace(0, 100, 200000)) * 0.25).astype(np.float32)
+        is_valid, normalized = processor.validate_and_normalize(audio)
+        assert is_valid
+        assert normalized is audio
+        assert normalized.dtype == np.float32
+        assert np.max(np.abs(normalized)) == pytest.approx(1.0, abs=1e-6)
+    
+    def test_validate_and_normalize_rejects_bad_audio(self):
+        """Test silence, NaN and Inf are rejected"""
+        silent = np.full(150000, 1e-4, dtype=np.float32)
+        assert not processor.validate_and_normalize(silent)[0]
+        
+        for bad_value in (np.nan, np.inf):
+            audio = np.full(150000, 0.5, dtype=np.float32)
+            audio[-1] = bad_value
+            assert not processor.validate_and_normalize(audio)[0]
+            assert not processor.validate_audio(audio)
+        
+        assert not processor.validate_and_normalize(np.array([], dtype=np.float32))[0]
+    
+    def test_validate_audio_scans_floats_in_place(self, monkeypatch):
+        """Test float input is validated without a float64 copy and integer input without overflow"""
+        audio = np.full(150000, 0.5, dtype=np.float32)
+        scanned = []
+        peak_amplitude = processor._peak_amplitude
+        monkeypatch.setattr(processor, "_peak_amplitude", lambda a: scanned.append(a) or peak_amplitude(a))
+        assert processor.validate_audio(audio)
+        assert scanned[0] is audio
+        
+        assert processor.validate_audio(np.array([0, -32768, 5], dtype=np.int16))
+        assert scanned[1].dtype == np.float64
+    
+    def test_decode_uses_configured_dtype(self):
+        """Test decoding stays in the configured precision"""
+        payload = base64.b64encode(create_audio_bytes(sample_rate=22050)).decode('utf-8')
+        audio, _ = processor.decode_base64_audio(payload)
+        assert audio.dtype == np.dtype(settings.AUDIO_DTYPE)
+    
+    def test_trim_to_speech_drops_silence(self):
+        """Test VAD keeps voiced regions and reports the speech ratio"""
+        vad = AudioProcessor()
+        vad.vad_aggressiveness = 2
+        audio, speech_ratio = vad.trim_to_speech(create_silence_heavy_audio())
+        assert 0.2 < speech_ratio < 0.35
+        assert len(audio) == pytest.approx(40 * 16000 * speech_ratio, rel=0.01)
+    
+    def test_trim_to_speech_budget_applies_to_speech(self):
+        """Test the length cap is applied after silence is removed"""
+        vad = AudioProcessor()
+        vad.vad_aggressiveness = 1
+        vad.max_length = 5
+        audio, speech_ratio = vad.trim_to_speech(create_silence_heavy_audio())
+        assert len(audio) == 5 * vad.sample_rate
+        assert speech_ratio < 0.35
+    
+    def test_trim_to_speech_keeps_continuous_audio(self):
+        """Test clips without pauses pass through untouched"""
+        audio = (np.sin(np.linspace(0, 2000, 48000)) * 0.5).astype(np.float32)
+        trimmed, speech_ratio = processor.trim_to_speech(audio)
+        assert speech_ratio == 1.0
+        assert len(trimmed) == len(audio)
+    
+    def test_trim_to_speech_short_clips(self):
+        """Test clips with fewer VAD frames than the hangover kernel keep a mask of the right length"""
+        from app.audio_processor import VAD_FRAME_LENGTH, VAD_HANGOVER_FRAMES
+        for n_samples in (VAD_FRAME_LENGTH, 4000, (2 * VAD_HANGOVER_FRAMES + 1) * VAD_FRAME_LENGTH - 1):
+            audio = (np.sin(np.linspace(0, n_samples / 8, n_samples)) * 0.5).astype(np.float32)
+            assert len(processor.detect_speech(audio)) == n_samples // VAD_FRAME_LENGTH
+            trimmed, speech_ratio = processor.trim_to_speech(audio)
+            assert len(trimmed) == n_samples
+            assert speech_ratio == 1.0
+    
+    def test_trim_to_speech_disabled(self):
+        """Test aggressiveness 0 only applies the length cap"""
+        vad = AudioProcessor()
+        vad.vad_aggressiveness = 0
+        assert vad.decode_max_length == settings.MAX_AUDIO_LENGTH
+        audio, speech_ratio = vad.trim_to_speech(create_silence_heavy_audio())
+        assert speech_ratio == 1.0
+        assert len(audio) == settings.MAX_AUDIO_LENGTH * settings.SAMPLE_RATE
@@ -0,0 +1,91 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import config
+from app.config import RuntimeLayout, get_runtime_layout, get_settings
+
+@pytest.fixture
+def sixteen_cores(monkeypatch):
+    """Pretend to run on a 16-core node with fresh settings"""
+    monkeypatch.setattr(config, "available_cores", lambda: list(range(16)))
+    get_runtime_layout.cache_clear()
+    yield get_settings()
+    get_runtime_layout.cache_clear()
+
+class TestRuntimeLayout:
+    def test_derived_layout_fills_cores(self, sixteen_cores, monkeypatch):
+        """Test the default layout splits cores evenly without oversubscribing"""
+        monkeypatch.setattr(sixteen_cores, "WORKERS", 0)
+        monkeypatch.setattr(sixteen_cores, "THREADS_PER_WORKER", 0)
+        monkeypatch.setattr(sixteen_cores, "MAX_WORKERS", 4)
+        monkeypatch.setattr(sixteen_cores, "JOB_WORKERS", 0)
+        layout = get_runtime_layout()
+        assert layout.workers == 4
+        assert layout.threads_per_worker == 4
+    
+    def test_job_workers_share_cores(self, sixteen_cores, monkeypatch):
+        """Test job processes spawned per server worker are counted in the thread split"""
+        monkeypatch.setattr(sixteen_cores, "WORKERS", 4)
+        monkeypatch.setattr(sixteen_cores, "THREADS_PER_WORKER", 0)
+        monkeypatch.setattr(sixteen_cores, "JOB_WORKERS", 1)
+        layout = get_runtime_layout()
+        assert layout.job_workers == 1
+        assert layout.threads_per_worker == 2
+    
+    def test_explicit_workers(self, sixteen_cores, monkeypatch):
+        """Test an explicit worker count gets the remaining cores as threads"""
+        monkeypatch.setattr(sixteen_cores, "WORKERS", 16)
+        monkeypatch.setattr(sixteen_cores, "THREADS_PER_WORKER", 0)
+        monkeypatch.setattr(sixteen_cores, "JOB_WORKERS", 0)
+        layout = get_runtime_layout()
+        assert layout.workers == 16
+        assert layout.threads_per_worker == 1
+    
+    def test_worker_cores_are_disjoint(self):
+        """Test pinned workers get separate cores and wrap on small machines"""
+        layout = RuntimeLayout(workers=4, threads_per_worker=4, cores=list(range(16)))
+        assigned = [core for index in range(4) for core in layout.worker_cores(index)]
+        assert sorted(assigned) == list(range(16))
+        
+        small = RuntimeLayout(workers=4, threads_per_worker=2, cores=[0, 1, 2])
+        assert small.worker_cores(2) == [1, 2]
+        
+        # Each server worker's block also covers its job processes
+        with_jobs = RuntimeLayout(workers=4, threads_per_worker=2, cores=list(range(16)), job_workers=1)
+        assert with_jobs.worker_cores(1) == [4, 5, 6, 7]
+    
+    def test_only_pin_worker_pins(self, sixteen_cores, monkeypatch):
+        """Test configure_runtime never claims a slot; pin_worker binds the serving process"""
+        monkeypatch.setattr(sixteen_cores, "PIN_WORKERS", True)
+        monkeypatch.setattr(sixteen_cores, "WORKERS", 4)
+        monkeypatch.setattr(sixteen_cores, "THREADS_PER_WORKER", 4)
+        monkeypatch.setattr(sixteen_cores, "JOB_WORKERS", 0)
+        monkeypatch.setattr(config, "_claim_worker_slot", lambda workers: 1)
+        pinned = []
+        monkeypatch.setattr(config.os, "sched_setaffinity", lambda pid, cores: pinned.append(cores), raising=False)
+        
+        config.configure_runtime()
+        assert pinned == []
+        
+        layout = config.pin_worker()
+        assert layout.worker_index == 1
+        assert pinned == [[4, 5, 6, 7]]
+    
+    def test_child_uses_parent_threads(self, sixteen_cores, monkeypatch):
+        """Test an explicit thread count overrides the derived layout and inherited env vars"""
+        monkeypatch.setattr(sixteen_cores, "WORKERS", 4)
+        monkeypatch.setattr(sixteen_cores, "THREADS_PER_WORKER", 0)
+        monkeypatch.setattr(sixteen_cores, "JOB_WORKERS", 1)
+        for var in config.THREAD_ENV_VARS:
+            monkeypatch.setenv(var, "2")
+        # A pinned child sees only its parent's block of cores
+        monkeypatch.setattr(config, "available_cores", lambda: [4, 5, 6, 7])
+        
+        layout = config.configure_runtime(threads=2)
+        assert layout.threads_per_worker == 2
+        assert get_runtime_layout().threads_per_worker == 2
+        assert all(os.environ[var] == "2" for var in config.THREAD_ENV_VARS)
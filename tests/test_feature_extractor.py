@@ -0,0 +1,76 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.feature_extractor import FeatureExtractor, _filterbanks
+from app.predictor import VoicePredictor
+from app.config import get_settings
+
+settings = get_settings()
+
+def create_voice_like_audio(duration=3.0, sample_rate=16000):
+    """Harmonic tone with noise so every feature has a non-trivial value"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    audio = sum(np.sin(2 * np.pi * 180 * k * t) / k for k in range(1, 6))
+    audio = audio + 0.05 * rng.standard_normal(len(t))
+    return audio / np.max(np.abs(audio))
+
+class TestFeatureExtractor:
+    def test_feature_vector_shape(self):
+        """Test features are a fixed 100-dim float64 vector"""
+        features = FeatureExtractor().extract_features(create_voice_like_audio())
+        assert features.shape == (100,)
+        assert features.dtype == np.float64
+        assert np.all(np.isfinite(features))
+    
+    def test_filterbanks_built_at_init(self):
+        """Test the first request does not pay for building the filterbanks"""
+        _filterbanks.cache_clear()
+        FeatureExtractor()
+        assert _filterbanks.cache_info().currsize == 1
+    
+    def test_float32_matches_float64(self):
+        """Test the float32 pipeline agrees with float64 features and predictions"""
+        audio = create_voice_like_audio()
+        
+        extractor = FeatureExtractor()
+        extractor.dtype = np.dtype(np.float64)
+        reference = extractor.extract_features(audio)
+        extractor.dtype = np.dtype(np.float32)
+        features = extractor.extract_features(audio.astype(np.float32))
+        
+        np.testing.assert_allclose(features, reference, rtol=1e-3, atol=1e-3)
+        
+        predictor = VoicePredictor()
+        label, confidence, _ = predictor.predict(features)
+        ref_label, ref_confidence, _ = predictor.predict(reference)
+        assert label == ref_label
+        assert confidence == pytest.approx(ref_confidence, abs=1e-3)
+    
+    def test_fft_backends_agree(self):
+        """Test every FFT backend produces the same features"""
+        audio = create_voice_like_audio().astype(np.float32)
+        extractor = FeatureExtractor()
+        
+        extractor.set_fft_backend("numpy")
+        reference = extractor.extract_features(audio)
+        for backend in ("scipy", "pyfftw"):
+            extractor.set_fft_backend(backend, workers=2)
+            np.testing.assert_allclose(extractor.extract_features(audio), reference, rtol=1e-3, atol=1e-3)
+    
+    def test_stft_matches_librosa(self):
+        """Test the shared STFT matches librosa.stft framing and values"""
+        import librosa
+        audio = create_voice_like_audio(duration=1.3)
+        extractor = FeatureExtractor()
+        extractor.dtype = np.dtype(np.float64)
+        
+        magnitude = extractor._stft_magnitude(audio)
+        reference = np.abs(librosa.stft(audio, n_fft=extractor.n_fft, hop_length=extractor.hop_length))
+        assert magnitude.shape == reference.shape
+        np.testing.assert_allclose(magnitude, reference, rtol=1e-5, atol=1e-6)
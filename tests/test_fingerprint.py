@@ -0,0 +1,144 @@
+import pytest
+import io
+import numpy as np
+import soundfile as sf
+import librosa
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import get_settings
+from app.fingerprint import FingerprintIndex, compute_fingerprint
+from app.pipeline import DetectionPipeline
+from tests.test_api import create_dummy_audio_base64
+
+settings = get_settings()
+SR = 16000
+
+def synthetic_voice(seed, duration=4.0):
+    """Gliding harmonic source through random formants, gated like syllables"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * SR)) / SR
+    f0 = 120 + 40 * rng.random() + 20 * np.sin(2 * np.pi * rng.uniform(0.5, 2) * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SR
+    formants = rng.uniform(300, 3000, 3)
+    audio = sum(
+        np.sin(k * phase) * sum(np.exp(-((k * f0 - f) / 200) ** 2) for f in formants) / np.sqrt(k)
+        for k in range(1, 30)
+    )
+    audio *= 0.3 + 0.7 * (np.sin(2 * np.pi * rng.uniform(2, 5) * t) > 0)
+    return (audio / np.max(np.abs(audio))).astype(np.float32)
+
+def utterance(voice_seed, content_seed, duration=4.0):
+    """One synthetic speaker (pitch range and vowel formants) saying a random syllable sequence"""
+    voice = np.random.default_rng(voice_seed)
+    f0_base = 100 + 60 * voice.random()
+    vowels = voice.uniform(250, 3000, (5, 3))
+    rng = np.random.default_rng(1000 + content_seed)
+    n = int(duration * SR)
+    t = np.arange(n) / SR
+    f0 = f0_base + 25 * np.sin(2 * np.pi * rng.uniform(0.3, 1.5) * t + rng.uniform(0, 6))
+    phase = 2 * np.pi * np.cumsum(f0) / SR
+    audio = np.zeros(n)
+    start = 0
+    while start < n:
+        syllable = slice(start, min(start + int(rng.uniform(0.15, 0.35) * SR), n))
+        formants = vowels[rng.integers(len(vowels))]
+        audio[syllable] = sum(
+            np.sin(k * phase[syllable]) * sum(np.exp(-((k * f0[syllable] - f) / 200) ** 2) for f in formants) / np.sqrt(k)
+            for k in range(1, 30)
+        ) * np.hanning(syllable.stop - syllable.start)
+        start = syllable.stop + int(rng.uniform(0.02, 0.12) * SR)
+    return (audio / np.max(np.abs(audio))).astype(np.float32)
+
+def reencode(audio, sample_rate, fmt='WAV', subtype='PCM_16'):
+    """Round-trip through another sample rate and container"""
+    resampled = librosa.resample(audio, orig_sr=SR, target_sr=sample_rate)
+    buffer = io.BytesIO()
+    sf.write(buffer, resampled, sample_rate, format=fmt, subtype=subtype)
+    buffer.seek(0)
+    decoded, sr = sf.read(buffer, dtype='float32')
+    decoded = librosa.resample(decoded, orig_sr=sr, target_sr=SR)
+    return decoded / np.max(np.abs(decoded))
+
+def similarity(a, b):
+    return 1 - bin(a.bits ^ b.bits).count('1') / 256
+
+class TestFingerprint:
+    @pytest.mark.parametrize("audio", [synthetic_voice(1), utterance(1, 0)], ids=["voice", "utterance"])
+    def test_robust_to_reencoding_and_trimming(self, audio):
+        """Test edited copies of a clip stay above the default threshold"""
+        original = compute_fingerprint(audio, SR)
+        variants = [
+            reencode(audio, 8000),
+            reencode(audio, 22050),
+            reencode(audio, SR, fmt='OGG', subtype='VORBIS'),
+            audio[SR // 10:],
+            np.concatenate([np.zeros(SR, dtype=np.float32), audio, np.zeros(SR // 3, dtype=np.float32)]),
+            audio * 0.3,
+        ]
+        for variant in variants:
+            assert similarity(original, compute_fingerprint(variant, SR)) >= settings.FINGERPRINT_THRESHOLD
+    
+    def test_distinct_clips_differ(self):
+        """Test unrelated clips fall well below the threshold"""
+        original = compute_fingerprint(synthetic_voice(1), SR)
+        for seed in range(2, 8):
+            assert similarity(original, compute_fingerprint(synthetic_voice(seed), SR)) < 0.85
+    
+    def test_same_voice_different_content_differ(self):
+        """Test other utterances by the same speaker do not reach the default threshold"""
+        for voice in range(3):
+            fingerprints = [compute_fingerprint(utterance(voice, content), SR) for content in range(5)]
+            for i, a in enumerate(fingerprints):
+                for b in fingerprints[i + 1:]:
+                    assert similarity(a, b) < 0.9
+
+class TestFingerprintIndex:
+    def test_lookup_and_language_scope(self):
+        """Test a near-duplicate hits only within its language"""
+        index = FingerprintIndex(max_entries=10, threshold=0.95)
+        audio = synthetic_voice(1)
+        index.add(compute_fingerprint(audio, SR), "Tamil", {'classification': "Human"})
+        
+        duplicate = compute_fingerprint(reencode(audio, 8000), SR)
+        assert index.lookup(duplicate, "Tamil")['classification'] == "Human"
+        assert index.lookup(duplicate, "Hindi") is None
+        assert index.lookup(compute_fingerprint(synthetic_voice(2), SR), "Tamil") is None
+        
+        stats = index.stats()
+        assert stats['hits'] == 1
+        assert stats['hit_rate'] == pytest.approx(1 / 3)
+    
+    def test_bounded_size_evicts_oldest(self):
+        """Test the index never grows past max_entries"""
+        index = FingerprintIndex(max_entries=2, threshold=0.95)
+        fingerprints = [compute_fingerprint(synthetic_voice(seed), SR) for seed in range(3)]
+        for fingerprint in fingerprints:
+            index.add(fingerprint, "English", {'classification': "Human"})
+        
+        assert index.stats()['size'] == 2
+        assert index.stats()['evictions'] == 1
+        assert index.lookup(fingerprints[0], "English") is None
+        assert index.lookup(fingerprints[2], "English") is not None
+        assert all(index._bands.values())
+
+class TestPipelineDeduplication:
+    def test_repeat_submission_skips_feature_extraction(self, monkeypatch):
+        """Test a resubmitted clip is answered from the index"""
+        pipeline = DetectionPipeline()
+        payload = create_dummy_audio_base64(duration=2.0)
+        first = pipeline.run(payload, "English")
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("features should not be recomputed")
+        monkeypatch.setattr(pipeline.feature_extractor, "extract_features", fail)
+        
+        trace = {}
+        second = pipeline.run(payload, "English", trace=trace)
+        assert second.classification == first.classification
+        assert second.confidence == first.confidence
+        assert trace['fingerprint_similarity'] == 1.0
+        assert pipeline.fingerprints.stats()['hits'] == 1
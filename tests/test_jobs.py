@@ -0,0 +1,221 @@
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import time
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import main
+import app.jobs
+from app.jobs import JobStore, JobWorkerPool, check_callback_url, process_next, send_callback
+from app.config import get_settings
+from tests.test_api import create_dummy_audio_base64
+
+settings = get_settings()
+client = TestClient(main.app)
+headers = {"Authorization": f"Bearer {settings.API_KEY}"}
+
+class FlakyPipeline:
+    """Pipeline stub that fails a fixed number of times before succeeding"""
+    def __init__(self, failures, error=RuntimeError):
+        self.failures = failures
+        self.error = error
+    
+    def run(self, audio_data, language):
+        if self.failures > 0:
+            self.failures -= 1
+            raise self.error("boom")
+        return main.pipeline.run(audio_data, language)
+
+@pytest.fixture
+def job_store(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(main, "job_store", store)
+    return store
+
+class TestJobs:
+    def test_submit_and_poll(self, job_store):
+        """Test a submitted job is queued, processed and returns the detection result"""
+        response = client.post(
+            "/jobs",
+            json={"audio_data": create_dummy_audio_base64(), "language": "Hindi"},
+            headers=headers
+        )
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert response.json()["status"] == "queued"
+        
+        assert process_next(job_store, main.pipeline)
+        assert not process_next(job_store, main.pipeline)
+        
+        data = client.get(f"/jobs/{job_id}", headers=headers).json()
+        assert data["status"] == "done"
+        assert data["attempts"] == 1
+        assert data["result"]["language"] == "Hindi"
+        assert 0 <= data["result"]["confidence"] <= 1
+    
+    def test_unknown_job(self, job_store):
+        """Test polling an unknown job id"""
+        response = client.get("/jobs/does-not-exist", headers=headers)
+        assert response.status_code == 404
+    
+    def test_jobs_require_auth(self, job_store):
+        """Test job endpoints are authenticated"""
+        response = client.post("/jobs", json={"audio_data": create_dummy_audio_base64(), "language": "English"})
+        assert response.status_code == 401
+    
+    def test_transient_failure_is_retried(self, job_store):
+        """Test internal errors are retried until a later attempt succeeds"""
+        job_id = job_store.submit(create_dummy_audio_base64(), "Tamil")
+        pipeline = FlakyPipeline(failures=settings.JOB_MAX_ATTEMPTS - 1)
+        
+        while process_next(job_store, pipeline):
+            pass
+        
+        job = job_store.get(job_id)
+        assert job["status"] == "done"
+        assert job["attempts"] == settings.JOB_MAX_ATTEMPTS
+    
+    def test_retries_are_bounded(self, job_store):
+        """Test a job that keeps failing ends up failed"""
+        job_id = job_store.submit(create_dummy_audio_base64(), "Tamil")
+        
+        while process_next(job_store, FlakyPipeline(failures=100)):
+            pass
+        
+        job = job_store.get(job_id)
+        assert job["status"] == "failed"
+        assert job["attempts"] == settings.JOB_MAX_ATTEMPTS
+    
+    def test_invalid_audio_is_not_retried(self, job_store):
+        """Test bad audio fails on the first attempt"""
+        job_id = job_store.submit(create_dummy_audio_base64(), "Telugu")
+        process_next(job_store, FlakyPipeline(failures=1, error=ValueError))
+        
+        job = job_store.get(job_id)
+        assert job["status"] == "failed"
+        assert job["attempts"] == 1
+    
+    def test_expired_lease_is_reclaimed(self, job_store):
+        """Test a job held by a dead worker is picked up again"""
+        job_id = job_store.submit(create_dummy_audio_base64(), "English")
+        job_store.lease_seconds = -1
+        assert job_store.claim()["id"] == job_id
+        
+        reclaimed = job_store.claim()
+        assert reclaimed["id"] == job_id
+        assert reclaimed["attempts"] == 2
+    
+    def test_expired_last_attempt_still_notifies(self, job_store, monkeypatch):
+        """Test a job whose final lease expired is failed and its webhook is still called"""
+        sent = []
+        monkeypatch.setattr(app.jobs, "send_callback", lambda url, payload: sent.append((url, payload)))
+        job_id = job_store.submit(create_dummy_audio_base64(), "English", "https://93.184.216.34/hook")
+        job_store.lease_seconds = -1
+        for _ in range(settings.JOB_MAX_ATTEMPTS):
+            job_store.claim()
+        
+        assert process_next(job_store, FlakyPipeline(failures=100))
+        (url, payload), = sent
+        assert url == "https://93.184.216.34/hook"
+        assert payload["job_id"] == job_id
+        assert payload["status"] == "failed"
+        assert not process_next(job_store, FlakyPipeline(failures=100))
+    
+    def test_purge_removes_only_old_finished_jobs(self, job_store):
+        """Test the retention sweep keeps pending and recent jobs"""
+        old_id = job_store.submit(create_dummy_audio_base64(), "English")
+        job_store.complete(old_id, {})
+        pending_id = job_store.submit(create_dummy_audio_base64(), "English")
+        
+        job_store.retention_seconds = 3600
+        assert job_store.purge() == 0
+        job_store.retention_seconds = -1
+        assert job_store.purge() == 1
+        assert job_store.get(old_id) is None
+        assert job_store.get(pending_id)["status"] == "queued"
+    
+    def test_callback_url_must_be_http(self, job_store):
+        """Test malformed or non-http callback URLs are rejected at submission"""
+        for url in ("not-a-url", "file:///etc/passwd", "ftp://example.com/hook"):
+            response = client.post(
+                "/jobs",
+                json={"audio_data": create_dummy_audio_base64(), "language": "English", "callback_url": url},
+                headers=headers
+            )
+            assert response.status_code == 422
+        assert job_store.stats()["queued"] == 0
+    
+    def test_callback_url_must_be_public(self, job_store):
+        """Test webhooks aimed at internal addresses are rejected at submission"""
+        for url in ("http://127.0.0.1/hook", "http://localhost:8000/hook", "http://10.0.0.5/hook",
+                    "http://169.254.169.254/latest/meta-data", "http://[::1]/hook"):
+            response = client.post(
+                "/jobs",
+                json={"audio_data": create_dummy_audio_base64(), "language": "English", "callback_url": url},
+                headers=headers
+            )
+            assert response.status_code == 422, url
+        assert job_store.stats()["queued"] == 0
+        check_callback_url("https://93.184.216.34/hook")
+    
+    def test_callback_allowed_hosts(self, monkeypatch):
+        """Test CALLBACK_ALLOWED_HOSTS restricts webhooks to the listed hosts"""
+        monkeypatch.setattr(settings, "CALLBACK_ALLOWED_HOSTS", ["hooks.internal"])
+        check_callback_url("http://hooks.internal/done")
+        with pytest.raises(ValueError):
+            check_callback_url("https://93.184.216.34/hook")
+    
+    def test_internal_callback_is_not_sent(self, monkeypatch):
+        """Test the address check is repeated before delivery"""
+        def fail(*args, **kwargs):
+            raise AssertionError("internal webhook was contacted")
+        monkeypatch.setattr(app.jobs._callback_opener, "open", fail)
+        send_callback("http://127.0.0.1:9/hook", {"status": "done"})
+    
+    def test_bad_callback_does_not_raise(self):
+        """Test webhook delivery errors, including unusable URLs, are only logged"""
+        send_callback("not-a-url", {"status": "done"})
+        send_callback("http://127.0.0.1:9/hook", {"status": "done"})
+    
+    def test_exited_workers_are_respawned(self, tmp_path, monkeypatch):
+        """Test the pool replaces a worker process that died"""
+        monkeypatch.setattr(app.jobs, "SUPERVISE_INTERVAL", 0.05)
+        pool = JobWorkerPool(str(tmp_path / "jobs.db"), workers=1)
+        pool.start()
+        try:
+            dead = pool.processes[0]
+            dead.kill()
+            dead.join()
+            for _ in range(100):
+                if pool.restarts:
+                    break
+                time.sleep(0.05)
+            assert pool.restarts == 1
+            assert pool.processes[0] is not dead
+            assert pool.processes[0].is_alive()
+        finally:
+            pool.stop()
+        assert pool.processes == []
+    
+    def test_workers_get_parent_thread_count(self, tmp_path, monkeypatch):
+        """Test job workers are started with this process's thread count"""
+        started = []
+        
+        class FakeProcess:
+            def __init__(self, target, args, name, daemon):
+                started.append(args)
+            
+            def start(self):
+                pass
+        
+        pool = JobWorkerPool(str(tmp_path / "jobs.db"), workers=2)
+        monkeypatch.setattr(pool._ctx, "Process", FakeProcess)
+        monkeypatch.setattr(app.jobs, "SUPERVISE_INTERVAL", 3600)
+        pool.start()
+        pool._stopping.set()
+        threads = app.jobs.get_runtime_layout().threads_per_worker
+        assert started == [(pool.db_path, threads)] * 2
+
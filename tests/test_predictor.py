@@ -0,0 +1,131 @@
+import pytest
+import pickle
+import numpy as np
+import sys
+import os
+import threading
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from app import predictor as predictor_module
+from app.predictor import VoicePredictor, PredictorRouter
+
+def write_artifact(directory, seed, scaler=True):
+    """Pickle a small classifier (and its scaler) into directory/"""
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((20, 100))
+    model = RandomForestClassifier(n_estimators=5, random_state=seed)
+    model.fit(X, rng.integers(0, 2, 20))
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'classifier.pkl'), 'wb') as f:
+        pickle.dump(model, f)
+    if scaler:
+        with open(os.path.join(directory, 'scaler.pkl'), 'wb') as f:
+            pickle.dump(StandardScaler().fit(X), f)
+    return str(directory)
+
+@pytest.fixture(scope="module")
+def default_predictor():
+    return VoicePredictor()
+
+@pytest.fixture
+def artifacts(tmp_path):
+    return {
+        language: write_artifact(tmp_path / language.lower(), seed)
+        for seed, language in enumerate(["Tamil", "Hindi", "Telugu"])
+    }
+
+class TestVoicePredictor:
+    def test_predict_batch_matches_predict(self, default_predictor):
+        """Test batched inference returns the same results as one-by-one prediction"""
+        features = np.random.default_rng(0).standard_normal((8, 100))
+        batch = default_predictor.predict_batch(features)
+        assert batch == [default_predictor.predict(row) for row in features]
+
+class TestPredictorRouter:
+    def test_unmapped_language_uses_default(self, default_predictor, artifacts):
+        """Test languages without an artifact fall back to the global model"""
+        router = PredictorRouter(default_predictor, artifacts, max_resident=2, memory_budget_mb=64)
+        assert router.get("English") is default_predictor
+        assert router.stats()['fallbacks'] == 1
+        assert router.stats()['loads'] == 0
+    
+    def test_lazy_load_and_reuse(self, default_predictor, artifacts):
+        """Test a language model is loaded once and then served from memory"""
+        router = PredictorRouter(default_predictor, artifacts, max_resident=2, memory_budget_mb=64)
+        tamil = router.get("Tamil")
+        assert tamil is not default_predictor
+        assert router.get("Tamil") is tamil
+        
+        stats = router.stats()
+        assert stats['loads'] == 1
+        assert stats['hits'] == 1
+        assert stats['load_time_ms_max'] > 0
+        assert stats['resident_bytes'] == tamil.memory_bytes > 0
+        
+        label, confidence, _ = tamil.predict(np.zeros(100))
+        assert label in ("AI-generated", "Human")
+    
+    def test_lru_eviction(self, default_predictor, artifacts):
+        """Test the least recently used model is evicted at the residency limit"""
+        router = PredictorRouter(default_predictor, artifacts, max_resident=2, memory_budget_mb=64)
+        router.get("Tamil")
+        router.get("Hindi")
+        router.get("Tamil")
+        router.get("Telugu")
+        
+        stats = router.stats()
+        assert list(stats['resident']) == ["Tamil", "Telugu"]
+        assert stats['evictions'] == 1
+    
+    def test_memory_budget_eviction(self, default_predictor, artifacts):
+        """Test the memory budget keeps only the newest model when artifacts are too big"""
+        router = PredictorRouter(default_predictor, artifacts, max_resident=3, memory_budget_mb=0)
+        router.get("Tamil")
+        router.get("Hindi")
+        assert list(router.stats()['resident']) == ["Hindi"]
+    
+    def test_missing_artifact_falls_back(self, default_predictor, tmp_path):
+        """Test a broken mapping serves the global model without retrying the load"""
+        router = PredictorRouter(default_predictor, {"Malayalam": str(tmp_path / "missing")})
+        assert router.get("Malayalam") is default_predictor
+        assert router.get("Malayalam") is default_predictor
+        assert router.stats()['load_failures'] == 1
+    
+    def test_missing_scaler_falls_back(self, default_predictor, tmp_path):
+        """Test a language model without its scaler is not served on unscaled features"""
+        artifact = write_artifact(tmp_path / "tamil", 0, scaler=False)
+        router = PredictorRouter(default_predictor, {"Tamil": artifact})
+        assert router.get("Tamil") is default_predictor
+        assert router.stats()['load_failures'] == 1
+    
+    def test_cold_load_does_not_block_resident_models(self, default_predictor, artifacts, monkeypatch):
+        """Test loading one language leaves already resident languages servable"""
+        router = PredictorRouter(default_predictor, artifacts, max_resident=3, memory_budget_mb=64)
+        tamil = router.get("Tamil")
+        
+        loading, release = threading.Event(), threading.Event()
+        real_predictor = predictor_module.VoicePredictor
+        
+        def slow_predictor(*args, **kwargs):
+            loading.set()
+            release.wait(5)
+            return real_predictor(*args, **kwargs)
+        
+        monkeypatch.setattr(predictor_module, "VoicePredictor", slow_predictor)
+        results = []
+        loader = threading.Thread(target=lambda: results.append(router.get("Hindi")))
+        loader.start()
+        try:
+            assert loading.wait(5)
+            assert router.get("Tamil") is tamil
+            assert not results
+        finally:
+            release.set()
+            loader.join()
+        assert results[0] is not default_predictor
+        assert router.stats()['loads'] == 2
+
@@ -0,0 +1,92 @@
+import pytest
+import time
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import main
+from app.config import get_settings
+from app.profiling import RequestProfiler
+from tests.test_api import create_dummy_audio_base64
+
+settings = get_settings()
+client = TestClient(main.app)
+ADMIN_KEY = "test-admin-key"
+
+@pytest.fixture
+def profiler(monkeypatch):
+    """Fresh profiler with the admin API enabled"""
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", ADMIN_KEY)
+    profiler = RequestProfiler()
+    monkeypatch.setattr(main, "profiler", profiler)
+    # Keep the duplicate index from short-circuiting the stages under test
+    monkeypatch.setattr(main.pipeline, "fingerprints", None)
+    return profiler
+
+def detect(extra_headers=None):
+    headers = {"Authorization": f"Bearer {settings.API_KEY}", **(extra_headers or {})}
+    return client.post(
+        "/detect",
+        json={"audio_data": create_dummy_audio_base64(), "language": "English"},
+        headers=headers
+    )
+
+def get_captures():
+    response = client.get("/admin/slow-requests", headers={"X-Admin-Key": ADMIN_KEY})
+    assert response.status_code == 200
+    return response.json()["captures"]
+
+class TestProfiling:
+    def test_fast_requests_are_not_captured(self, profiler):
+        """Test nothing is kept for fast, unsampled requests"""
+        assert detect().status_code == 200
+        assert get_captures() == []
+        assert profiler.stats()["requests"] == 1
+    
+    def test_slow_check_includes_time_before_the_call(self, profiler):
+        """Test time spent before processing (e.g. queueing) counts toward the slow threshold"""
+        profiler.slow_request_ms = 500
+        profiler.call(lambda trace: None, trace={}, start=time.perf_counter() - 1.0)
+        capture, = profiler.captures()
+        assert capture["slow"] and capture["total_ms"] >= 1000
+    
+    def test_slow_request_capture(self, profiler):
+        """Test slow requests keep their stage breakdown and audio metadata"""
+        profiler.slow_request_ms = 0
+        assert detect().status_code == 200
+        
+        capture, = get_captures()
+        assert capture["slow"]
+        assert capture["profile"] is None
+        assert set(capture["stages"]) == {"base64", "admission", "decode", "validate", "vad", "features", "predict"}
+        assert capture["audio"]["format"] == "WAV"
+        assert capture["audio"]["sample_rate"] == 16000
+        assert capture["language"] == "English"
+    
+    def test_profile_header_requires_admin_key(self, profiler):
+        """Test X-Profile runs cProfile only for admin callers"""
+        detect({"X-Profile": "1"})
+        assert get_captures() == []
+        
+        detect({"X-Profile": "1", "X-Admin-Key": ADMIN_KEY})
+        capture, = get_captures()
+        assert "extract_features" in capture["profile"]
+    
+    def test_ring_buffer_is_bounded(self, profiler):
+        """Test old captures are dropped once the buffer is full"""
+        profiler.slow_request_ms = 0
+        for _ in range(profiler._captures.maxlen + 3):
+            profiler.call(lambda trace: None, trace={})
+        assert len(profiler.captures()) == profiler._captures.maxlen
+    
+    def test_admin_endpoints_are_protected(self, profiler, monkeypatch):
+        """Test admin endpoints need the admin key and are off without one"""
+        assert client.get("/admin/slow-requests").status_code == 401
+        assert client.get("/admin/slow-requests", headers={"X-Admin-Key": "wrong"}).status_code == 403
+        assert client.delete("/admin/slow-requests", headers={"X-Admin-Key": ADMIN_KEY}).status_code == 200
+        
+        monkeypatch.setattr(settings, "ADMIN_API_KEY", "")
+        assert client.get("/admin/slow-requests", headers={"X-Admin-Key": ""}).status_code == 403
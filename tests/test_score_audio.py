@@ -0,0 +1,119 @@
+import pytest
+import csv
+import importlib.util
+import json
+import numpy as np
+import soundfile as sf
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'scripts', 'score_audio.py')
+spec = importlib.util.spec_from_file_location("score_audio", SCRIPT)
+score_audio = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(score_audio)
+
+@pytest.fixture
+def archive(tmp_path):
+    """A few tones, one corrupt file and one non-audio file"""
+    t = np.arange(16000) / 16000
+    for i in range(4):
+        sf.write(str(tmp_path / f"clip{i}.wav"), 0.3 * np.sin(2 * np.pi * (200 + 100 * i) * t), 16000)
+    (tmp_path / "broken.wav").write_bytes(b"junk" * 100)
+    (tmp_path / "notes.txt").write_text("not audio")
+    return tmp_path
+
+class TestScoreAudio:
+    def test_scores_directory_to_csv(self, archive, tmp_path):
+        """Test every audio file gets a row and bad files are reported, not fatal"""
+        output = str(tmp_path / "scores.csv")
+        score_audio.main([str(archive), "-o", output, "--workers", "0", "--batch-size", "2"])
+        
+        with open(output, newline="") as f:
+            rows = {os.path.basename(row["path"]): row for row in csv.DictReader(f)}
+        assert sorted(rows) == ["broken.wav", "clip0.wav", "clip1.wav", "clip2.wav", "clip3.wav"]
+        assert rows["broken.wav"]["error"]
+        assert rows["clip0.wav"]["classification"] in ("AI-generated", "Human")
+        assert 0 <= float(rows["clip0.wav"]["confidence"]) <= 1
+    
+    def test_manifest_and_resume(self, archive, tmp_path):
+        """Test manifest languages are used and a rerun skips scored files"""
+        manifest = archive / "manifest.csv"
+        manifest.write_text("path,language\nclip0.wav,Tamil\nclip1.wav,Hindi\n")
+        output = str(tmp_path / "scores.jsonl")
+        
+        score_audio.main([str(manifest), "-o", output, "--workers", "0"])
+        manifest.write_text("path,language\nclip0.wav,Tamil\nclip1.wav,Hindi\nclip2.wav,Telugu\n")
+        score_audio.main([str(manifest), "-o", output, "--workers", "0"])
+        
+        with open(output) as f:
+            rows = [json.loads(line) for line in f]
+        assert [row["language"] for row in rows] == ["Tamil", "Hindi", "Telugu"]
+    
+    @pytest.mark.parametrize("suffix", [".jsonl", ".csv"])
+    def test_resume_after_truncated_write(self, archive, tmp_path, suffix):
+        """Test a half-written last row from a killed run is dropped and rescored"""
+        output = str(tmp_path / f"scores{suffix}")
+        score_audio.main([str(archive), "-o", output, "--workers", "0"])
+        with open(output, "rb") as f:
+            complete = f.read()
+        with open(output, "wb") as f:
+            f.write(complete[:-10])
+        
+        score_audio.main([str(archive), "-o", output, "--workers", "0"])
+        with open(output, newline="") as f:
+            if suffix == ".jsonl":
+                rows = [json.loads(line) for line in f]
+            else:
+                rows = list(csv.DictReader(f))
+        assert sorted(os.path.basename(row["path"]) for row in rows) == [
+            "broken.wav", "clip0.wav", "clip1.wav", "clip2.wav", "clip3.wav"
+        ]
+    
+    def test_unexpected_errors_are_per_clip(self, archive, tmp_path, monkeypatch):
+        """Test a non-ValueError failure is recorded on its row instead of aborting the run"""
+        score_audio._init_worker()
+        extract = score_audio._pipeline.extract
+        
+        def flaky_extract(audio_bytes):
+            if audio_bytes == (archive / "clip1.wav").read_bytes():
+                raise RuntimeError("boom")
+            return extract(audio_bytes)
+        
+        monkeypatch.setattr(score_audio, "_init_worker", lambda threads=None: None)
+        monkeypatch.setattr(score_audio._pipeline, "extract", flaky_extract)
+        output = str(tmp_path / "scores.jsonl")
+        score_audio.main([str(archive), "-o", output, "--workers", "0"])
+        
+        with open(output) as f:
+            rows = {os.path.basename(row["path"]): row for row in map(json.loads, f)}
+        assert rows["clip1.wav"]["error"] == "Internal error: boom"
+        assert rows["clip1.wav"]["classification"] is None
+        assert rows["clip2.wav"]["classification"] in ("AI-generated", "Human")
+    
+    def test_retry_errors_rescores_failed_rows(self, archive, tmp_path):
+        """Test error rows are kept on a plain resume and rescored with --retry-errors"""
+        output = str(tmp_path / "scores.csv")
+        score_audio.main([str(archive), "-o", output, "--workers", "0"])
+        (archive / "broken.wav").write_bytes((archive / "clip0.wav").read_bytes())
+        
+        score_audio.main([str(archive), "-o", output, "--workers", "0"])
+        with open(output, newline="") as f:
+            assert len(list(csv.DictReader(f))) == 5
+        
+        score_audio.main([str(archive), "-o", output, "--workers", "0", "--retry-errors"])
+        with open(output, newline="") as f:
+            rows = [row for row in csv.DictReader(f) if os.path.basename(row["path"]) == "broken.wav"]
+        assert len(rows) == 2
+        assert rows[0]["error"] and not rows[1]["error"]
+    
+    def test_threads_split_cores_across_scoring_processes(self, monkeypatch):
+        """Test scoring processes share the cores without reserving any for job workers"""
+        monkeypatch.setattr(score_audio.get_settings(), "THREADS_PER_WORKER", 0)
+        monkeypatch.setattr(score_audio.get_settings(), "JOB_WORKERS", 3)
+        monkeypatch.setattr(score_audio, "available_cores", lambda: list(range(8)))
+        assert score_audio.process_threads(4) == 2
+        assert score_audio.process_threads(0) == 8
+